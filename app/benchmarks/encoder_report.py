@@ -0,0 +1,157 @@
+"""
+Latency / memory / recall report for encoder backends and quantized indexes.
+
+Each encoder backend runs in a fresh process so its resident memory is measured
+in isolation. Every (backend, index type) pair is compared against the current
+setup (PyTorch encoder + exact float index) over the live index snapshot's chunks.
+Run from the project root:
+
+    python -m app.benchmarks.encoder_report --backends torch,onnx --index-types flat,sq8,binary
+    python -m app.benchmarks.encoder_report --backends onnx --model-file onnx/model_qint8_avx512_vnni.onnx
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import multiprocessing
+import numpy as np
+import faiss
+from concurrent.futures import ProcessPoolExecutor
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.config import Config
+
+Config.initialize_paths(project_root)
+
+from app.services.vector_store.snapshot import SnapshotStore
+from app.services.vector_store.index_factory import QUANTIZED_INDEX_TYPES, build_index
+from app.benchmarks.index_report import _recall, _sample_queries
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentiles(latencies: list) -> dict:
+    return {
+        "p50": round(float(np.percentile(latencies, 50)), 4),
+        "p95": round(float(np.percentile(latencies, 95)), 4),
+    }
+
+
+def _run_backend(backend: str, model_file: str, index_types: list, num_queries: int, k: int) -> list:
+    """Runs in a child process: loads one encoder, then measures every index type with it."""
+    from app.services.vector_store.embeddings import DEFAULT_MODEL_NAME, get_embedding_model
+
+    snapshot = SnapshotStore(Config.DATA_PATH).read(1)
+    if snapshot is None:
+        raise SystemExit("No vector index found. Run the data pipeline first.")
+    texts = [snapshot.text_store[i] for i in sorted(snapshot.text_store)]
+    queries = _sample_queries(texts, num_queries)
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    model = get_embedding_model(DEFAULT_MODEL_NAME, backend, model_file)
+    load_seconds = time.perf_counter() - start
+
+    corpus = np.array(model.encode(texts, batch_size=Config.EMBEDDING_BATCH_SIZE)).astype('float32')
+    faiss.normalize_L2(corpus)
+    encode_latencies, query_vectors = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vector = np.array(model.encode([query])).astype('float32')
+        encode_latencies.append((time.perf_counter() - start) * 1000)
+        query_vectors.append(vector[0])
+    query_vectors = np.array(query_vectors)
+    faiss.normalize_L2(query_vectors)
+
+    rows = []
+    for index_type in index_types:
+        index = build_index(corpus, index_type)
+        rerank = index_type in QUANTIZED_INDEX_TYPES and Config.VECTOR_RERANK_FACTOR > 1
+        fetch_k = k * Config.VECTOR_RERANK_FACTOR if rerank else k
+        search_latencies, found = [], []
+        for query in query_vectors:
+            start = time.perf_counter()
+            _, indices = index.search(query.reshape(1, -1), fetch_k)
+            candidates = [int(i) for i in indices[0] if i >= 0]
+            if rerank:
+                scores = corpus[candidates] @ query
+                candidates = [candidates[i] for i in np.argsort(-scores, kind='stable')]
+            search_latencies.append((time.perf_counter() - start) * 1000)
+            found.append((candidates + [-1] * k)[:k])
+        rows.append({
+            "backend": backend + (f" ({model_file})" if model_file else ""),
+            "index_type": index_type + (" + rerank" if rerank else ""),
+            "chunks": len(texts),
+            "model_load_seconds": round(load_seconds, 3),
+            "rss_mb": round(_rss_mb(), 1),
+            "model_rss_mb": round(_rss_mb() - rss_before, 1),
+            "index_mb": round(len(faiss.serialize_index(index)) / (1024 * 1024), 3),
+            "encode_ms": _percentiles(encode_latencies),
+            "search_ms": _percentiles(search_latencies),
+            "found": found,
+        })
+    return rows
+
+
+def run_report(backends: list, model_file: str, index_types: list, num_queries: int, k: int) -> list:
+    """Measures every backend in its own process and scores recall@k against torch + flat."""
+    context = multiprocessing.get_context('spawn')
+    baseline, rows = None, []
+    for backend in ['torch'] + [b for b in backends if b != 'torch']:
+        types = index_types if backend in backends else ['flat']
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                results = pool.submit(
+                    _run_backend, backend, model_file if backend != 'torch' else None, types, num_queries, k
+                ).result()
+            except Exception as e:
+                rows.append({"backend": backend, "error": str(e)})
+                continue
+        if baseline is None:
+            baseline = np.array(next(r["found"] for r in results if r["index_type"] == 'flat'))
+        if backend in backends:
+            rows.extend(results)
+
+    for row in rows:
+        if "found" in row:
+            row[f"recall@{k}"] = round(_recall(baseline, np.array(row.pop("found"))), 4)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='torch,onnx', help="Comma-separated encoder backends.")
+    parser.add_argument('--model-file', help="Exported model file for non-torch backends.")
+    parser.add_argument('--index-types', default='flat,sq8,binary', help="Comma-separated index types.")
+    parser.add_argument('--queries', type=int, default=200, help="Number of sampled queries.")
+    parser.add_argument('--k', type=int, default=5, help="Neighbours retrieved per query.")
+    parser.add_argument('--json', dest='json_path', help="Optional path to also write the results as JSON.")
+    args = parser.parse_args()
+
+    rows = run_report(args.backends.split(','), args.model_file, args.index_types.split(','), args.queries, args.k)
+    for row in rows:
+        print(json.dumps(row))
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Local stand-ins for the external services the app depends on, so benchmarks and
+load tests run offline and repeatably:
+
+- StubGenerativeModel: a Gemini model double with configurable latency and token streaming.
+- FixtureServer: one local HTTP server playing the GitHub API (REST and GraphQL),
+  a small static website and a PDF résumé, with ETags so warm runs exercise the caches.
+"""
+import re
+import json
+import base64
+import asyncio
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+_WORDS = (
+    "async api backend cache cluster container dashboard data deploy docker embedding engine "
+    "fastapi feature graph index latency learning model monitor network pipeline python query "
+    "queue react redis request retrieval search server service stream test throughput token "
+    "vector worker build design scale parse render schedule optimize measure refactor migrate"
+).split()
+
+
+def synthetic_text(rng: np.random.Generator, sentences: int) -> str:
+    """Deterministic filler prose built from a small technical vocabulary."""
+    out = []
+    for _ in range(sentences):
+        words = rng.choice(_WORDS, size=int(rng.integers(8, 20)))
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def synthetic_readme(rng: np.random.Generator, name: str, sections: int = 4) -> str:
+    """A markdown README with a title, a few headed sections and a code block."""
+    parts = [f"# {name}\n\n{synthetic_text(rng, 3)}"]
+    for i in range(sections):
+        parts.append(f"## Section {i + 1}\n\n{synthetic_text(rng, int(rng.integers(3, 9)))}")
+    parts.append("```bash\npip install -r requirements.txt\npython -m app\n```")
+    return "\n\n".join(parts)
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Builds a minimal text-only PDF, one string per page (lines split on newlines)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages))).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        lines = [re.sub(r'([\\()])', r'\\\1', line) for line in text.split("\n")]
+        body = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 750 Td {body} ET".encode('latin-1', errors='replace')
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+# --- Stub Gemini ---
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubStream:
+    """Async iterator over response chunks, paced like a streaming Gemini reply."""
+    def __init__(self, session: 'StubChatSession', tokens: List[str]):
+        self.session = session
+        self.tokens = tokens
+
+    async def __aiter__(self):
+        model = self.session.model
+        await asyncio.sleep(model.first_token_latency)
+        for i in range(0, len(self.tokens), model.tokens_per_chunk):
+            if i:
+                await asyncio.sleep(model.token_latency * model.tokens_per_chunk)
+            yield _StubResponse("".join(self.tokens[i:i + model.tokens_per_chunk]))
+        self.session.history.append({'role': 'model', 'parts': ["".join(self.tokens)]})
+
+
+class StubChatSession:
+    """Mimics the parts of genai.ChatSession that GeminiService uses."""
+    def __init__(self, model: 'StubGenerativeModel', history: Optional[list] = None):
+        self.model = model
+        self.history = list(history or [])
+
+    async def send_message_async(self, content, stream: bool = False):
+        self.history.append({'role': 'user', 'parts': [content]})
+        tokens = self.model.reply_tokens(content)
+        if stream:
+            return _StubStream(self, tokens)
+        await asyncio.sleep(self.model.first_token_latency + self.model.token_latency * len(tokens))
+        text = "".join(tokens)
+        self.history.append({'role': 'model', 'parts': [text]})
+        return _StubResponse(text)
+
+
+class StubGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel. Replies take `first_token_latency` seconds
+    before the first token and `token_latency` seconds per further token; streamed
+    replies arrive in chunks of `tokens_per_chunk` tokens.
+    """
+    model_name = 'models/stub-gemini'
+
+    def __init__(self, first_token_latency: float = 0.3, token_latency: float = 0.01,
+                 response_tokens: int = 60, tokens_per_chunk: int = 4):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.response_tokens = response_tokens
+        self.tokens_per_chunk = max(tokens_per_chunk, 1)
+
+    def reply_tokens(self, prompt: str) -> List[str]:
+        # Deterministic per prompt, so repeated questions get the same answer
+        seed = int(hashlib.sha1(str(prompt).encode('utf-8')).hexdigest()[:8], 16)
+        words = np.random.default_rng(seed).choice(_WORDS, size=self.response_tokens)
+        return [word + " " for word in words]
+
+    def start_chat(self, history: Optional[list] = None) -> StubChatSession:
+        return StubChatSession(self, history)
+
+    def generate_content(self, prompt: str) -> _StubResponse:
+        return _StubResponse("".join(self.reply_tokens(prompt)).strip())
+
+
+# --- Local HTTP fixtures ---
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    server: 'FixtureServer'
+    # Keep-alive, like the real services; every response carries a Content-Length
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = 'application/json',
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_cacheable(self, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        headers = dict(headers or {}, ETag=etag)
+        if self.headers.get('If-None-Match') == etag:
+            # Like GitHub, a 304 carries the validators but not the pagination Link header
+            self._send(304, headers={name: value for name, value in headers.items() if name != 'Link'})
+        else:
+            self._send(200, body, content_type, headers)
+
+    def do_GET(self):
+        fixtures = self.server.fixtures
+        url = urlparse(self.path)
+        path = url.path
+        self.server.record(path)
+        rate_headers = {'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': '0'}
+
+        if path.startswith('/github/') and self.server.take_throttle():
+            return self._send(429, b'{"message": "secondary rate limit"}', headers={'Retry-After': '2'})
+        if path == '/github/user/repos':
+            query = parse_qs(url.query)
+            per_page = min(int(query.get('per_page', ['30'])[0]), fixtures.page_size)
+            page = int(query.get('page', ['1'])[0])
+            names = list(fixtures.readmes)
+            start = (page - 1) * per_page
+            body = json.dumps([
+                {"name": name, "owner": {"login": fixtures.owner}, "description": f"The {name} project",
+                 "html_url": f"{self.server.url}/site/{name}", "stargazers_count": i, "private": False}
+                for i, name in enumerate(names[start:start + per_page], start=start)
+            ]).encode()
+            headers = dict(rate_headers)
+            if start + per_page < len(names):
+                headers['Link'] = f'<{self.server.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+            return self._send_cacheable(body, 'application/json', headers)
+        match = re.fullmatch(r'/github/repos/[^/]+/([^/]+)/readme', path)
+        if match:
+            readme = fixtures.readmes.get(match.group(1))
+            if readme is None:
+                return self._send(404, b'{"message": "Not Found"}', headers=rate_headers)
+            body = json.dumps({"content": base64.b64encode(readme.encode('utf-8')).decode('ascii')}).encode()
+            return self._send_cacheable(body, 'application/json', rate_headers)
+        if path == '/robots.txt':
+            return self._send_cacheable(b"User-agent: *\nAllow: /\n", 'text/plain')
+        if path in fixtures.pages:
+            return self._send_cacheable(fixtures.pages[path].encode('utf-8'), 'text/html; charset=utf-8')
+        if path == '/resume.pdf':
+            return self._send_cacheable(fixtures.pdf, 'application/pdf')
+        self._send(404, b"", 'text/plain')
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        fixtures = self.server.fixtures
+        path = urlparse(self.path).path
+        self.server.record(path)
+        if path != '/github/graphql':
+            return self._send(404, b"", 'text/plain')
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        start = int((request.get("variables") or {}).get("cursor") or 0)
+        names = list(fixtures.readmes)
+        nodes = [
+            {"name": name, "owner": {"login": fixtures.owner}, "description": f"The {name} project",
+             "url": f"{self.server.url}/site/{name}", "stargazerCount": i, "isPrivate": False,
+             "readmeMd": None if name in fixtures.unaliased_readmes else {"text": fixtures.readmes[name]},
+             "readmeLowerMd": None, "readmeRst": None, "readmeTxt": None, "readmePlain": None}
+            for i, name in enumerate(names[start:start + 100], start=start)
+        ]
+        end = start + len(nodes)
+        body = {"data": {"viewer": {"repositories": {
+            "pageInfo": {"hasNextPage": end < len(names), "endCursor": str(end)},
+            "nodes": nodes,
+        }}}}
+        self._send(200, json.dumps(body).encode())
+
+
+class _Fixtures:
+    """The generated content served by FixtureServer."""
+    def __init__(self, repos: int, site_pages: int, pdf_pages: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.owner = 'bench'
+        self.readmes = {f"project-{i:03d}": synthetic_readme(rng, f"project-{i:03d}") for i in range(repos)}
+        # Repositories whose README file name GraphQL's aliases miss (e.g. README.markdown)
+        self.unaliased_readmes = set()
+        # Largest page /user/repos serves; smaller values exercise Link-header pagination
+        self.page_size = 100
+
+        self.pages = {}
+        for i in range(site_pages):
+            # Each page links to the next two, so the crawler has to discover them breadth-first
+            links = "".join(f'<a href="/site/page-{j}.html">Page {j}</a> ' for j in (i + 1, i + 2) if j < site_pages)
+            self.pages[f"/site/page-{i}.html"] = (
+                f"<html><head><title>Page {i}</title></head><body><nav>{links}</nav>"
+                f"<h1>Page {i}</h1><p>{synthetic_text(rng, 6)}</p><p>{synthetic_text(rng, 6)}</p>"
+                f"<footer>footer</footer></body></html>"
+            )
+        # The crawler normalises the start URL without its trailing slash
+        self.pages["/site"] = self.pages["/site/"] = self.pages.get("/site/page-0.html", "<html><body></body></html>")
+
+        self.pdf = make_pdf([
+            "\n".join([f"Resume page {p + 1}"] + [synthetic_text(rng, 1)[:90] for _ in range(20)])
+            for p in range(pdf_pages)
+        ])
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Serves the fake GitHub API under /github, a static website under /site and a PDF
+    at /resume.pdf from a background thread on a free local port:
+
+        with FixtureServer(repos=30) as fixtures:
+            os.environ.update(fixtures.env())
+    """
+    daemon_threads = True
+
+    def __init__(self, repos: int = 30, site_pages: int = 20, pdf_pages: int = 3, seed: int = 0):
+        super().__init__(('127.0.0.1', 0), _FixtureHandler)
+        self.fixtures = _Fixtures(repos, site_pages, pdf_pages, seed)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self._hits_lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        # The next `throttled` GitHub GETs are answered 429 with a Retry-After
+        self.throttled = 0
+        self._thread = threading.Thread(target=self.serve_forever, name="fixture-server", daemon=True)
+
+    def record(self, path: str):
+        with self._hits_lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def take_throttle(self) -> bool:
+        with self._hits_lock:
+            if self.throttled <= 0:
+                return False
+            self.throttled -= 1
+            return True
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing the app's data sources at this server."""
+        return {
+            "GITHUB_API_URL": f"{self.url}/github",
+            "GITHUB_PERSONAL_ACCESS_TOKEN": "benchmark-token",
+            "RESUME_URL": f"{self.url}/resume.pdf",
+            "PDF_URLS": "",
+            "WEBSITE_URL": f"{self.url}/site/",
+            "CRAWL_DELAY_SECONDS": "0",
+        }
+
+    def __enter__(self) -> 'FixtureServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
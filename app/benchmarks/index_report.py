@@ -0,0 +1,101 @@
+"""
+Recall-vs-latency report for the supported FAISS index types.
+
+Builds every index type over the current corpus (the live index snapshot) and compares
+each one against exact flat search. Run from the project root:
+
+    python -m app.benchmarks.index_report --queries 200 --k 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.config import Config
+
+Config.initialize_paths(project_root)
+
+from app.services.vector_store.vector_store_service import VectorStoreService
+from app.services.vector_store.index_factory import INDEX_TYPES, build_index
+
+
+def _sample_queries(texts: list, num_queries: int, seed: int = 0) -> list:
+    """Uses the opening of randomly sampled chunks as stand-in user queries."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(texts), size=min(num_queries, len(texts)), replace=False)
+    return [texts[i][:120] for i in picks]
+
+
+def _recall(truth: np.ndarray, found: np.ndarray) -> float:
+    """Average fraction of the exact top-k that the approximate index also returned."""
+    k = truth.shape[1]
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def run_report(num_queries: int, k: int) -> list:
+    """Builds each index type and measures build time, per-query latency and recall@k."""
+    store = VectorStoreService()
+    if not store.load_index():
+        raise SystemExit("No vector index found. Run the data pipeline first.")
+    texts = list(store.text_store.values())
+
+    corpus = np.array(store.model.encode(texts, show_progress_bar=True)).astype('float32')
+    faiss.normalize_L2(corpus)
+    queries = np.array(store.model.encode(_sample_queries(texts, num_queries))).astype('float32')
+    faiss.normalize_L2(queries)
+
+    rows, truth = [], None
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build_index(corpus, index_type)
+        build_seconds = time.perf_counter() - start
+
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, indices = index.search(query.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found.append(indices[0])
+        found = np.array(found)
+        if index_type == 'flat':
+            truth = found
+
+        rows.append({
+            "index_type": index_type,
+            "chunks": len(texts),
+            "build_seconds": round(build_seconds, 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 4),
+            f"recall@{k}": round(_recall(truth, found), 4),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=200, help="Number of sampled queries.")
+    parser.add_argument('--k', type=int, default=5, help="Neighbours retrieved per query.")
+    parser.add_argument('--json', dest='json_path', help="Optional path to also write the results as JSON.")
+    args = parser.parse_args()
+
+    rows = run_report(args.queries, args.k)
+    headers = list(rows[0].keys())
+    print(" | ".join(f"{h:>16}" for h in headers))
+    for row in rows:
+        print(" | ".join(f"{str(row[h]):>16}" for h in headers))
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Benchmark and load-test suite that runs entirely against local stand-ins
+(see app.benchmarks.fixtures): a stub Gemini model, a fake GitHub API, a static
+website and a PDF résumé. Indexes, caches and logs go to a scratch directory,
+never to the project's data/ directory. Run from the project root:
+
+    python -m app.benchmarks.perf_suite --out benchmark_results/$(git rev-parse --short HEAD).json
+    python -m app.benchmarks.perf_suite --only load --users 32 --requests 500 --stream
+    python -m app.benchmarks.perf_suite --compare benchmark_results/old.json benchmark_results/new.json
+
+Phases:
+  micro     _chunk_text, create_and_save_index, search (cold/warm/batched), log page reads
+  pipeline  run_data_pipeline end to end, cold and then warm (HTTP caches, no re-embedding)
+  load      concurrent /chat (or /chat/stream) requests over HTTP against a local uvicorn server
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.benchmarks.fixtures import FixtureServer, StubGenerativeModel, synthetic_text
+
+# app.config reads the environment when it is first imported, so the app modules
+# are imported inside the phases, after main() has pointed the environment at the fixtures.
+
+PHASES = ('micro', 'pipeline', 'load')
+
+
+def _ms_percentiles(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {}
+    ms = np.array(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _stage_snapshot() -> Dict[str, dict]:
+    """Server-side stage quantiles recorded by timed_stage() since the last reset."""
+    from app.services.metrics import STAGE_SECONDS
+    return {
+        labels[0]: {key: round(value * 1000, 3) if key != "count" else value for key, value in stats.items()}
+        for labels, stats in sorted(STAGE_SECONDS.snapshot().items())
+    }
+
+
+def _git_revision() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=project_root, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=project_root,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+        return {"commit": commit or None, "dirty": dirty}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+# --- Micro-benchmarks ---
+
+def bench_chunking(texts: List[str], repeats: int) -> dict:
+    from app.config import Config
+    from app.pipelines.chunking import Chunker, make_token_counter
+    from app.pipelines.data_pipeline import _chunk_text
+    from app.services.vector_store.embeddings import DEFAULT_MODEL_NAME, get_embedding_model
+
+    model = get_embedding_model(DEFAULT_MODEL_NAME, Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL_FILE)
+    chunkers = {
+        "model_tokens": Chunker(make_token_counter(model), Config.CHUNK_MAX_TOKENS, Config.CHUNK_OVERLAP_TOKENS),
+        "estimated_tokens": None,
+    }
+    results = {}
+    for name, chunker in chunkers.items():
+        latencies, chunks = [], 0
+        for _ in range(repeats):
+            for text in texts:
+                start = time.perf_counter()
+                chunks += len(_chunk_text(text, chunker))
+                latencies.append(time.perf_counter() - start)
+        results[name] = dict(
+            _ms_percentiles(latencies),
+            documents=len(texts),
+            chunks_per_document=round(chunks / (len(texts) * repeats), 2),
+            documents_per_s=round(len(latencies) / sum(latencies), 1),
+        )
+    return results
+
+
+def bench_indexing(data_path: str, num_chunks: int):
+    from app.config import Config
+    from app.services.metrics import STAGE_SECONDS
+    from app.services.vector_store.index_factory import describe_index
+    from app.services.vector_store.vector_store_service import VectorStoreService
+
+    Config.DATA_PATH = data_path
+    os.makedirs(data_path, exist_ok=True)
+    rng = np.random.default_rng(1)
+    chunks = [{"source": f"bench:{i // 8}", "text": synthetic_text(rng, 4)} for i in range(num_chunks)]
+
+    STAGE_SECONDS.clear()
+    store = VectorStoreService()
+    start = time.perf_counter()
+    store.create_and_save_index(chunks)
+    seconds = time.perf_counter() - start
+    stages = _stage_snapshot()
+    result = {
+        "chunks": num_chunks,
+        "index_type": describe_index(store.index),
+        "seconds": round(seconds, 3),
+        "chunks_per_s": round(num_chunks / seconds, 1),
+        "encode_seconds": round(stages.get("corpus_encode", {}).get("sum", 0) / 1000, 3),
+        "write_seconds": round(stages.get("index_write", {}).get("sum", 0) / 1000, 3),
+        "index_disk_bytes": store.index_stats()["disk_bytes"],
+    }
+    return store, [chunk["text"] for chunk in chunks], result
+
+
+def bench_search(store, texts: List[str], num_queries: int, k: int, batch_size: int) -> dict:
+    rng = np.random.default_rng(2)
+    picks = rng.choice(len(texts), size=min(num_queries, len(texts)), replace=False)
+    queries = [" ".join(texts[i].split()[:12]) for i in picks]
+
+    def timed(run) -> List[float]:
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    store.embedding_cache.clear()
+    store.result_cache.clear()
+    cold = timed(lambda q: store.search(q, k))
+    warm = timed(lambda q: store.search(q, k))
+
+    # Fresh queries (not cached), answered batch_size at a time
+    store.embedding_cache.clear()
+    store.result_cache.clear()
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        store.search_batch([(query, k) for query in queries[i:i + batch_size]])
+    batched_seconds = time.perf_counter() - start
+    return {
+        "queries": len(queries),
+        "k": k,
+        "cold": _ms_percentiles(cold),
+        "warm": _ms_percentiles(warm),
+        "cold_queries_per_s": round(len(queries) / sum(cold), 1),
+        f"batched_{batch_size}_queries_per_s": round(len(queries) / batched_seconds, 1),
+        "cache": store.cache_stats(),
+    }
+
+
+def _write_log(path: str, lines: int):
+    """Writes a text-format log with a traceback every 50 entries, one entry per 10ms."""
+    levels = ('INFO', 'INFO', 'INFO', 'DEBUG', 'WARNING')
+    modules = ('app.server', 'app.requests', 'app.services.gemini_service', 'app.pipelines.data_pipeline')
+    start = time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start + i / 100)) + f",{(i * 10) % 1000:03d}"
+            if i % 50 == 49:
+                f.write(f"{stamp} - {modules[i % 4]} - ERROR - Request {i} failed\n"
+                        "Traceback (most recent call last):\n  File \"app/server.py\", line 1, in chat\n"
+                        "RuntimeError: simulated failure\n")
+            else:
+                f.write(f"{stamp} - {modules[i % 4]} - {levels[i % 5]} - Handled request {i}\n")
+    return start
+
+
+def bench_logs(workdir: str, lines: int, page_size: int, repeats: int) -> dict:
+    """parse_log_file is a thin wrapper over LogReader.page, which is measured directly."""
+    from app.services.log_reader import LogReader
+
+    path = os.path.join(workdir, 'bench.log')
+    first_time = _write_log(path, lines)
+    reader = LogReader(path)
+
+    start = time.perf_counter()
+    total = reader.refresh()
+    index_build = time.perf_counter() - start
+
+    def timed(fresh_reader: bool = False, **filters) -> dict:
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            # A fresh reader has to load the persisted index first, like another worker process
+            (LogReader(path) if fresh_reader else reader).page(limit=page_size, **filters)
+            latencies.append(time.perf_counter() - start)
+        return _ms_percentiles(latencies)
+
+    return {
+        "entries": total,
+        "log_bytes": os.path.getsize(path),
+        "index_build_ms": round(index_build * 1000, 3),
+        "newest_page": timed(),
+        "newest_page_new_process": timed(fresh_reader=True),
+        "errors_only_page": timed(level='ERROR'),
+        "deep_page": timed(before=total // 2),
+        "time_window_page": timed(since=first_time + lines / 400, until=first_time + lines / 200),
+    }
+
+
+def run_micro(args, workdir: str, fixtures: FixtureServer) -> dict:
+    texts = list(fixtures.fixtures.readmes.values())
+    results = {"chunk_text": bench_chunking(texts, args.repeats)}
+    store, chunk_texts, results["create_and_save_index"] = bench_indexing(
+        os.path.join(workdir, 'micro-index'), args.index_chunks)
+    results["search"] = bench_search(store, chunk_texts, args.queries, args.k, args.batch_size)
+    results["log_page"] = bench_logs(workdir, args.log_lines, args.page_size, args.repeats)
+    store.executor.shutdown(wait=False)
+    return results
+
+
+# --- End-to-end pipeline ---
+
+def run_pipeline(args, workdir: str, fixtures: FixtureServer) -> dict:
+    from app.config import Config
+    from app.pipelines.data_pipeline import run_data_pipeline
+    from app.services.vector_store.vector_store_service import VectorStoreService
+
+    Config.DATA_PATH = os.path.join(workdir, 'pipeline')
+    os.makedirs(Config.DATA_PATH, exist_ok=True)
+    store = VectorStoreService()
+    results = {}
+    for run in ('cold', 'warm'):
+        requests_before = sum(fixtures.hits.values())
+        start = time.perf_counter()
+        stages = run_data_pipeline(reindex=True, vector_store=store)
+        seconds = time.perf_counter() - start
+        results[run] = {
+            "seconds": round(seconds, 3),
+            "stages": stages,
+            "http_requests": sum(fixtures.hits.values()) - requests_before,
+            "chunks_indexed": store.index.ntotal if store.index is not None else 0,
+        }
+    store.executor.shutdown(wait=False)
+    return results
+
+
+# --- Load test ---
+
+class _ServerThread:
+    """Runs the FastAPI app under uvicorn on a free local port in a background thread."""
+    def __init__(self, app):
+        import uvicorn
+        # proxy_headers + X-Forwarded-For give every simulated user its own client address (and session)
+        config = uvicorn.Config(app, host='127.0.0.1', port=0, log_config=None, access_log=False,
+                                lifespan='off', proxy_headers=True, forwarded_allow_ips='*')
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, name="bench-uvicorn", daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def _drive_load(base_url: str, queries: List[str], users: int, total: int, stream: bool,
+                      timeout: float) -> dict:
+    import httpx
+
+    latencies, first_bytes, statuses, errors = [], [], Counter(), Counter()
+    issued = iter(range(total))
+    path = "/chat/stream" if stream else "/chat"
+
+    async def user(number: int):
+        headers = {"X-Forwarded-For": f"10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}"}
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout) as client:
+            for request_number in issued:
+                query = queries[request_number % len(queries)]
+                start = time.perf_counter()
+                try:
+                    if stream:
+                        async with client.stream("POST", path, json={"query": query}) as response:
+                            first = None
+                            async for _ in response.aiter_raw():
+                                if first is None:
+                                    first = time.perf_counter() - start
+                            if first is not None:
+                                first_bytes.append(first)
+                    else:
+                        response = await client.post(path, json={"query": query})
+                    statuses[response.status_code] += 1
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError as e:
+                    errors[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(number) for number in range(users)))
+    seconds = time.perf_counter() - start
+    result = {
+        "endpoint": path,
+        "users": users,
+        "requests": total,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(sum(statuses.values()) / seconds, 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "errors": dict(errors),
+        "latency": _ms_percentiles(latencies),
+    }
+    if stream:
+        result["time_to_first_byte"] = _ms_percentiles(first_bytes)
+    return result
+
+
+def run_load(args, workdir: str, fixtures: FixtureServer) -> dict:
+    # Reuse the pipeline phase's index when it ran; otherwise the server builds one on setup
+    os.environ["DATA_PATH"] = os.path.join(workdir, 'pipeline')
+    import app.server as server
+    from app.services.metrics import STAGE_SECONDS
+
+    stub = StubGenerativeModel(args.stub_first_token_ms / 1000, args.stub_token_ms / 1000,
+                               args.stub_tokens, args.stub_tokens_per_chunk)
+    server.bot_service.gemini_service.model = stub
+    # Every simulated user would otherwise hit the 20/minute per-client limit almost at once
+    server.limiter.enabled = False
+    server.bot_service.setup_data(reindex=False)
+
+    queries = [
+        "What has he built with FastAPI?", "Tell me about his experience.", "Which projects use a vector index?",
+        "What is on his website?", "How do I contact him?", "Summarise his resume.",
+    ]
+    queries += [f"What is {name} about?" for name in fixtures.fixtures.readmes]
+    queries = queries[:max(args.unique_queries, 1)]
+
+    STAGE_SECONDS.clear()
+    with _ServerThread(server.app) as base_url:
+        result = asyncio.run(_drive_load(base_url, queries, args.users, args.requests, args.stream, args.timeout))
+    result.update(
+        unique_queries=len(queries),
+        stub_gemini={"first_token_ms": args.stub_first_token_ms, "token_ms": args.stub_token_ms,
+                     "tokens": args.stub_tokens},
+        server_stages_ms=_stage_snapshot(),
+        cache=server.bot_service.vector_store.cache_stats(),
+    )
+    return result
+
+
+# --- Comparison ---
+
+def _flatten(data, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(_flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix] = float(data)
+    return flat
+
+
+def compare(baseline_path: str, current_path: str):
+    """Prints every numeric result present in both files with its relative change."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = _flatten(json.load(f).get("results", {}))
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = _flatten(json.load(f).get("results", {}))
+    width = max((len(key) for key in baseline.keys() & current.keys()), default=10)
+    print(f"{'metric'.ljust(width)}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key.ljust(width)}  {old:>12.3f}  {new:>12.3f}  {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help=f"Comma-separated phases to run (default: all of {', '.join(PHASES)}).")
+    parser.add_argument('--out', default=os.path.join('benchmark_results', 'latest.json'),
+                        help="Where to write the JSON results (benchmark_results/ is git-ignored).")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Compare two result files instead of running the suite.")
+    parser.add_argument('--workdir', help="Scratch directory to use and keep (default: a temporary one).")
+    parser.add_argument('--log-level', default='WARNING', help="App log level while benchmarking.")
+    # Fixtures
+    parser.add_argument('--repos', type=int, default=40, help="Repositories served by the fake GitHub API.")
+    parser.add_argument('--site-pages', type=int, default=20, help="Pages on the local static website.")
+    parser.add_argument('--pdf-pages', type=int, default=3, help="Pages in the local PDF résumé.")
+    parser.add_argument('--graphql', action='store_true', help="Fetch repositories through the GraphQL API.")
+    # Micro-benchmarks
+    parser.add_argument('--repeats', type=int, default=20, help="Repetitions per micro-benchmark.")
+    parser.add_argument('--index-chunks', type=int, default=2000, help="Chunks indexed by create_and_save_index.")
+    parser.add_argument('--queries', type=int, default=200, help="Queries for the search benchmark.")
+    parser.add_argument('--k', type=int, default=5, help="Results per search.")
+    parser.add_argument('--batch-size', type=int, default=16, help="Queries per batched search.")
+    parser.add_argument('--log-lines', type=int, default=200000, help="Entries in the synthetic log file.")
+    parser.add_argument('--page-size', type=int, default=50, help="Entries per log page.")
+    # Load test
+    parser.add_argument('--users', type=int, default=16, help="Concurrent simulated users.")
+    parser.add_argument('--requests', type=int, default=200, help="Total chat requests.")
+    parser.add_argument('--stream', action='store_true', help="Load-test /chat/stream instead of /chat.")
+    parser.add_argument('--unique-queries', type=int, default=30, help="Distinct questions asked.")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds.")
+    parser.add_argument('--stub-first-token-ms', type=float, default=300.0, help="Stub Gemini time to first token.")
+    parser.add_argument('--stub-token-ms', type=float, default=10.0, help="Stub Gemini time per further token.")
+    parser.add_argument('--stub-tokens', type=int, default=60, help="Tokens per stub Gemini reply.")
+    parser.add_argument('--stub-tokens-per-chunk', type=int, default=4, help="Tokens per streamed chunk.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    phases = [p for p in (args.only.split(',') if args.only else PHASES) if p]
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        parser.error(f"Unknown phases: {', '.join(sorted(unknown))}")
+
+    scratch = None if args.workdir else tempfile.TemporaryDirectory(prefix='perf-suite-')
+    workdir = args.workdir or scratch.name
+    os.makedirs(workdir, exist_ok=True)
+
+    with FixtureServer(repos=args.repos, site_pages=args.site_pages, pdf_pages=args.pdf_pages) as fixtures:
+        os.environ.update(fixtures.env())
+        os.environ.update({
+            "GITHUB_USE_GRAPHQL": "true" if args.graphql else "false",
+            "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark-key"),
+            "UPDATE_TOKEN": "benchmark-token",
+            "DATA_PATH": os.path.join(workdir, 'data'),
+            "LOG_FILE": os.path.join(workdir, 'app.log'),
+            "LOG_LEVEL": args.log_level,
+        })
+        from app.config import Config
+        from app.services.log_setup import setup_logging
+        Config.initialize_paths(project_root)
+        setup_logging(Config)
+
+        results = {}
+        runners = {"micro": run_micro, "pipeline": run_pipeline, "load": run_load}
+        for phase in phases:
+            print(f"Running {phase} benchmarks...", file=sys.stderr)
+            results[phase] = runners[phase](args, workdir, fixtures)
+
+    report = {
+        "meta": dict(
+            _git_revision(),
+            timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpus=os.cpu_count(),
+            args={key: value for key, value in vars(args).items() if key not in ('compare', 'out')},
+        ),
+        "results": results,
+    }
+    out_dir = os.path.dirname(os.path.abspath(args.out))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {args.out}", file=sys.stderr)
+    if scratch is not None:
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,14 +12,130 @@ class Config:
     GITHUB_PAT = os.getenv('GITHUB_PERSONAL_ACCESS_TOKEN')
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     RESUME_URL = os.getenv('RESUME_URL')
+    # Extra PDFs to index alongside the resume (comma-separated URLs)
+    PDF_URLS = [url.strip() for url in os.getenv('PDF_URLS', '').split(',') if url.strip()]
     WEBSITE_URL = os.getenv('WEBSITE_URL')
+    GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
     
     # --- Security ---
     UPDATE_TOKEN = os.getenv('UPDATE_TOKEN')
 
     # --- Application Settings ---
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
+
+    # --- Concurrency Settings ---
+    # Max number of /chat requests processed at once by a single worker
+    CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '32'))
+    # Threads used for CPU-bound work (query encoding, FAISS search)
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '2'))
+    # Concurrent queries arriving within this window are encoded as one batch (0 disables batching)
+    QUERY_BATCH_WINDOW_MS = float(os.getenv('QUERY_BATCH_WINDOW_MS', '5'))
+    QUERY_BATCH_MAX_SIZE = int(os.getenv('QUERY_BATCH_MAX_SIZE', '32'))
+
+    # --- Data Source Settings ---
+    # Concurrent README fetches; pacing adapts to GitHub's rate-limit headers
+    GITHUB_MAX_WORKERS = int(os.getenv('GITHUB_MAX_WORKERS', '8'))
+    # Fetch repo metadata and READMEs with batched GraphQL queries (falls back to REST on error)
+    GITHUB_USE_GRAPHQL = os.getenv('GITHUB_USE_GRAPHQL', 'false').lower() in ('1', 'true', 'yes')
+    # Website crawler limits
+    CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '200'))
+    CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '5'))
+    CRAWL_MAX_WORKERS = int(os.getenv('CRAWL_MAX_WORKERS', '4'))
+    CRAWL_PER_HOST_CONCURRENCY = int(os.getenv('CRAWL_PER_HOST_CONCURRENCY', '2'))
+    CRAWL_DELAY_SECONDS = float(os.getenv('CRAWL_DELAY_SECONDS', '0.25'))
+    CRAWL_RESPECT_ROBOTS = os.getenv('CRAWL_RESPECT_ROBOTS', 'true').lower() in ('1', 'true', 'yes')
+    # PDFs with at least this many pages are extracted by a process pool
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', '4'))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '20'))
+    # On-disk cache for crawled pages and PDFs (data/http_cache.db)
+    HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+    # --- Indexing Pipeline Settings ---
+    # Bounded queues between the fetch, chunk and embed stages (back-pressure keeps memory flat)
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '256'))
+    # Chunks encoded per model call while indexing
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+    # Chunk size in embedding-model tokens (all-MiniLM-L6-v2 truncates input at 256)
+    CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '200'))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '32'))
+    # MinHash similarity above which a chunk counts as a near-duplicate (0 keeps near-duplicates)
+    CHUNK_DEDUP_THRESHOLD = float(os.getenv('CHUNK_DEDUP_THRESHOLD', '0.9'))
+
+    # --- Vector Index Settings ---
+    # 'auto', 'flat', 'hnsw', 'ivf_flat', 'ivf_pq', 'sq8' (int8) or 'binary' (1 bit per dimension);
+    # 'auto' switches from flat to HNSW above the threshold
+    VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'auto')
+    VECTOR_INDEX_AUTO_THRESHOLD = int(os.getenv('VECTOR_INDEX_AUTO_THRESHOLD', '10000'))
+    HNSW_M = int(os.getenv('HNSW_M', '32'))
+    HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '80'))
+    HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '64'))
+    IVF_NLIST = int(os.getenv('IVF_NLIST', '0'))  # 0 picks ~4*sqrt(chunk count)
+    IVF_NPROBE = int(os.getenv('IVF_NPROBE', '8'))
+    PQ_M = int(os.getenv('PQ_M', '16'))  # sub-quantizers; must divide the embedding dimension
+    # Quantized indexes fetch k * factor candidates and re-rank them with the float vectors (1 disables)
+    VECTOR_RERANK_FACTOR = int(os.getenv('VECTOR_RERANK_FACTOR', '4'))
+    # Encoder backend: 'torch', or 'onnx' / 'openvino' (optional extras) for faster CPU inference
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+    # Optional exported model file, e.g. 'onnx/model_qint8_avx512_vnni.onnx' for the int8 ONNX model
+    EMBEDDING_MODEL_FILE = os.getenv('EMBEDDING_MODEL_FILE')
+    # Published index snapshots kept on disk (the newest one is live)
+    INDEX_SNAPSHOTS_TO_KEEP = int(os.getenv('INDEX_SNAPSHOTS_TO_KEEP', '2'))
+    # Each snapshot is a full rewrite; incremental updates within this many seconds of the
+    # last write are served from memory and persisted by the next write (or at shutdown)
+    INDEX_WRITE_MIN_INTERVAL_SECONDS = int(os.getenv('INDEX_WRITE_MIN_INTERVAL_SECONDS', '300'))
+
+    # --- Retrieval Settings ---
+    # Chunks sent to the model per question
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '5'))
+    # Fuse BM25 keyword matches with dense results (reciprocal rank fusion)
+    HYBRID_SEARCH = os.getenv('HYBRID_SEARCH', 'true').lower() in ('1', 'true', 'yes')
+    # Candidates taken from each retriever before fusion
+    RETRIEVAL_CANDIDATES = int(os.getenv('RETRIEVAL_CANDIDATES', '20'))
+    RRF_K = int(os.getenv('RRF_K', '60'))
+    # Dense-only hits below this cosine similarity are dropped (0 disables the cut-off)
+    RETRIEVAL_MIN_SIMILARITY = float(os.getenv('RETRIEVAL_MIN_SIMILARITY', '0'))
+    # MMR relevance/diversity trade-off (1 disables diversity re-ranking)
+    MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', '0.7'))
+
+    # --- Retrieval Cache Settings (0 disables a cache) ---
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+    SEARCH_RESULT_CACHE_SIZE = int(os.getenv('SEARCH_RESULT_CACHE_SIZE', '1024'))
+
+    # --- Answer Cache Settings ---
+    # Opt-in: reuse answers to first-turn questions that closely match an earlier one
+    ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '256'))
+    # Minimum cosine similarity between query embeddings for a cached answer to be reused
+    ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+    # Cached answers expire after this many seconds (0 keeps them until the index changes or they are evicted)
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv('ANSWER_CACHE_TTL_SECONDS', '86400'))
+
+    # --- Session Settings ---
+    SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', '1000'))
+    SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', '1800'))
+    # History kept per session, beyond the system prompt
+    SESSION_MAX_TURNS = int(os.getenv('SESSION_MAX_TURNS', '10'))
+    SESSION_MAX_HISTORY_TOKENS = int(os.getenv('SESSION_MAX_HISTORY_TOKENS', '8000'))
+    # 'memory' (per process) or 'sqlite' (shared by every worker using the same file)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH')
+    # Any `limits` storage URI; defaults to the session database when SESSION_BACKEND is 'sqlite'
+    RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI')
     
+    # --- Logging Settings ---
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # 'text' (the classic one-line format) or 'json' (one JSON object per line, with request ids)
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    # Size-based rotation; ignored when LOG_ROTATE_WHEN is set
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    # Time-based rotation interval, e.g. 'midnight' or 'H' (see TimedRotatingFileHandler); empty disables it
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')
+
+    # --- Metrics Settings ---
+    # Latency quantiles on /metrics are computed over this many recent observations per stage
+    METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', '1024'))
+
     APP_ROOT = None 
     DATA_PATH = None
     LOG_FILE = None # <-- Add log file path
@@ -28,9 +144,17 @@ class Config:
     def initialize_paths(app_root: str):
         """Sets the root and data paths for the application."""
         Config.APP_ROOT = app_root
-        Config.DATA_PATH = os.path.join(app_root, 'data')
-        Config.LOG_FILE = os.path.join(app_root, 'app.log') # <-- Define log file path
+        # DATA_PATH / LOG_FILE env vars relocate them (e.g. a scratch directory for benchmarks)
+        Config.DATA_PATH = os.getenv('DATA_PATH') or os.path.join(app_root, 'data')
+        Config.LOG_FILE = os.getenv('LOG_FILE') or os.path.join(app_root, 'app.log') # <-- Define log file path
         os.makedirs(Config.DATA_PATH, exist_ok=True)
+        if not Config.SESSION_DB_PATH:
+            Config.SESSION_DB_PATH = os.path.join(Config.DATA_PATH, 'sessions.db')
+        if not Config.RATE_LIMIT_STORAGE_URI:
+            if Config.SESSION_BACKEND == 'sqlite':
+                Config.RATE_LIMIT_STORAGE_URI = f"sqlite://{os.path.abspath(Config.SESSION_DB_PATH)}"
+            else:
+                Config.RATE_LIMIT_STORAGE_URI = "memory://"
 
 
     @staticmethod
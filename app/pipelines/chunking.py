@@ -0,0 +1,241 @@
+import re
+import math
+import hashlib
+import logging
+import numpy as np
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+_HEADING_RE = re.compile(r'^#{1,6}\s+\S')
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+_TOKEN_ESTIMATE_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates a WordPiece token count (words plus punctuation) when no tokenizer is available."""
+    return len(_TOKEN_ESTIMATE_RE.findall(text))
+
+
+def make_token_counter(model=None) -> TokenCounter:
+    """
+    Returns a function counting tokens with the embedding model's own tokenizer,
+    so chunk sizes match what the encoder actually sees (and truncates).
+    """
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None:
+        return estimate_tokens
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False, truncation=False)['input_ids'])
+    return count_tokens
+
+
+def split_shared_lines(pages: List[Tuple[str, str]], min_share: float = 0.5) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Separates site boilerplate (navigation, footers) from crawled pages. Lines that
+    occur on at least two pages and on at least `min_share` of them are removed from
+    every page and returned once, in order of first appearance.
+    `pages` are (url, text) pairs; returns (pages without those lines, shared lines).
+    """
+    def normalise(line: str) -> str:
+        return " ".join(line.lower().split())
+
+    if len(pages) < 2:
+        return pages, []
+    counts = Counter()
+    for _, text in pages:
+        counts.update({normalise(line) for line in text.splitlines() if line.strip()})
+    needed = max(2, math.ceil(min_share * len(pages)))
+    boilerplate = {line for line, count in counts.items() if count >= needed}
+
+    stripped, shared, seen = [], [], set()
+    for url, text in pages:
+        kept = []
+        for line in text.splitlines():
+            key = normalise(line)
+            if key in boilerplate:
+                if key not in seen:
+                    seen.add(key)
+                    shared.append(line.strip())
+            elif key:
+                kept.append(line)
+        stripped.append((url, "\n".join(kept)))
+    return stripped, shared
+
+
+class Chunker:
+    """
+    Splits documents into chunks of at most `max_tokens` model tokens, following the
+    document's structure: markdown sections first, then paragraphs, then sentences,
+    and only as a last resort words. Each chunk repeats its section heading and
+    overlaps the previous chunk by up to `overlap_tokens` tokens of whole units.
+    """
+    def __init__(self, count_tokens: TokenCounter = estimate_tokens, max_tokens: int = 200, overlap_tokens: int = 32):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @staticmethod
+    def _sections(text: str) -> List[Tuple[str, str]]:
+        """Splits markdown text into (heading line, body) pairs. Text before the first heading has no heading."""
+        sections, heading, body = [], "", []
+        for line in text.splitlines():
+            if _HEADING_RE.match(line):
+                sections.append((heading, "\n".join(body)))
+                heading, body = line.strip(), []
+            else:
+                body.append(line)
+        sections.append((heading, "\n".join(body)))
+        return [(heading, body) for heading, body in sections if body.strip()]
+
+    def _split_words(self, text: str, budget: int) -> List[str]:
+        pieces, current, tokens = [], [], 0
+        for word in text.split():
+            word_tokens = self.count_tokens(word)
+            if current and tokens + word_tokens > budget:
+                pieces.append(" ".join(current))
+                current, tokens = [], 0
+            current.append(word)
+            tokens += word_tokens
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def _units(self, body: str, budget: int) -> List[Tuple[str, int]]:
+        """Breaks a section body into (text, token count) units that each fit in `budget`."""
+        units = []
+        for paragraph in _PARAGRAPH_RE.split(body):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            tokens = self.count_tokens(paragraph)
+            if tokens <= budget:
+                units.append((paragraph, tokens))
+                continue
+            for sentence in _SENTENCE_RE.split(paragraph):
+                tokens = self.count_tokens(sentence)
+                if tokens <= budget:
+                    units.append((sentence, tokens))
+                else:
+                    units.extend((piece, self.count_tokens(piece)) for piece in self._split_words(sentence, budget))
+        return units
+
+    def split(self, text: str, reserved_tokens: int = 0) -> List[str]:
+        """
+        Returns the chunk bodies for `text`. `reserved_tokens` is left free in every
+        chunk for a header the caller prepends.
+        """
+        if not isinstance(text, str) or not text.strip():
+            return []
+        chunks = []
+        for heading, body in self._sections(text):
+            heading_tokens = self.count_tokens(heading) if heading else 0
+            budget = max(self.max_tokens - reserved_tokens - heading_tokens, 16)
+            current: List[Tuple[str, int]] = []
+            current_tokens = 0
+            for unit in self._units(body, budget):
+                if current and current_tokens + unit[1] > budget:
+                    chunks.append(self._join(heading, current))
+                    # Carry whole trailing units over as overlap
+                    overlap, overlap_tokens = [], 0
+                    for previous in reversed(current):
+                        if overlap_tokens + previous[1] > self.overlap_tokens:
+                            break
+                        overlap.insert(0, previous)
+                        overlap_tokens += previous[1]
+                    if overlap_tokens + unit[1] > budget:
+                        overlap, overlap_tokens = [], 0
+                    current, current_tokens = overlap, overlap_tokens
+                current.append(unit)
+                current_tokens += unit[1]
+            if current:
+                chunks.append(self._join(heading, current))
+        return chunks
+
+    @staticmethod
+    def _join(heading: str, units: List[Tuple[str, int]]) -> str:
+        body = "\n".join(text for text, _ in units)
+        return f"{heading}\n{body}" if heading else body
+
+
+class ChunkDeduplicator:
+    """
+    Drops chunks that repeat earlier ones, exactly (normalised text hash) or nearly
+    (MinHash over word shingles, with LSH banding to find candidates), e.g. the same
+    navigation bar on every crawled page. A threshold of 0 disables near-duplicate checks.
+
+    Of a set of duplicates the copy with the smallest owner key (e.g. (source, position))
+    is kept, whatever order they arrive in, so concurrent fetches keep the same copy
+    (and the same chunk ids) from one run to the next.
+    """
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 3):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._seeds = np.random.default_rng(0x5eed).integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        # Kept chunks: normalised hash -> entry, LSH bucket -> entries, entry -> owner / signature
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._owners: List[tuple] = []
+        self._signatures: List[Optional[np.ndarray]] = []
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def _signature(self, words: List[str]) -> Optional[np.ndarray]:
+        if len(words) < self.shingle_size:
+            return None
+        shingles = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles],
+            dtype=np.uint64,
+        )
+        return np.bitwise_xor(hashes[:, None], self._seeds[None, :]).min(axis=0)
+
+    def _resolve(self, entry: int, owner: tuple) -> Tuple[bool, Optional[tuple]]:
+        """Settles a duplicate of `entry`: the smaller owner keeps it."""
+        if owner < self._owners[entry]:
+            displaced, self._owners[entry] = self._owners[entry], owner
+            return True, displaced
+        return False, None
+
+    def add(self, text: str, owner: tuple = ()) -> Tuple[bool, Optional[tuple]]:
+        """
+        Records a chunk owned by `owner` and returns (keep, displaced). A duplicate is
+        kept only if its owner sorts before the kept copy's, which it then displaces:
+        `displaced` is that copy's owner, for the caller to withdraw.
+        """
+        words = text.lower().split()
+        digest = hashlib.sha256(" ".join(words).encode('utf-8')).hexdigest()
+        if digest in self._exact:
+            self.exact_duplicates += 1
+            return self._resolve(self._exact[digest], owner)
+
+        signature = self._signature(words) if self.threshold > 0 else None
+        bands = []
+        if signature is not None:
+            bands = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+            # Lowest entry first, so the match doesn't depend on set ordering
+            for entry in sorted({i for key in bands for i in self._buckets.get(key, ())}):
+                if np.mean(self._signatures[entry] == signature) >= self.threshold:
+                    self.near_duplicates += 1
+                    self._exact[digest] = entry
+                    return self._resolve(entry, owner)
+
+        entry = len(self._owners)
+        self._owners.append(owner)
+        self._signatures.append(signature)
+        self._exact[digest] = entry
+        for key in bands:
+            self._buckets.setdefault(key, []).append(entry)
+        return True, None
+
+    def is_duplicate(self, text: str) -> bool:
+        """Returns True if `text` duplicates a chunk seen before; otherwise remembers it."""
+        return not self.add(text)[0]
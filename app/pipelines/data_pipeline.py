@@ -1,94 +1,322 @@
 import os
+import time
+import queue
 import logging
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from app.services.github_service import GitHubService
 from app.services.pdf_service import PDFService
 from app.services.scraping_service import ScrapingService # <-- Import new service
+from app.services.http_cache import HttpCache
+from app.services.metrics import HTTP_CACHE_HIT_RATIO, PIPELINE_STAGE_ITEMS, PIPELINE_STAGE_SECONDS
+from app.pipelines.chunking import Chunker, ChunkDeduplicator, make_token_counter, split_shared_lines
 from app.services.vector_store.vector_store_service import VectorStoreService
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
-def _chunk_text(text: str, chunk_size: int = 512, overlap: int = 50) -> list[str]:
+def _chunk_text(text: str, chunker: Optional[Chunker] = None, reserved_tokens: int = 0) -> list[str]:
     """
-    Splits a string into a list of overlapping chunks.
+    Splits a string into token-bounded chunks along its markdown sections,
+    paragraphs and sentences.
     """
-    if not isinstance(text, str) or not text.strip():
-        return []
+    return (chunker or Chunker()).split(text, reserved_tokens)
+
+
+def _make_chunks(source: str, text: str, header: str = "", chunker: Optional[Chunker] = None,
+                 dedup: Optional[ChunkDeduplicator] = None, **metadata) -> list[dict]:
+    """
+    Chunks a document and tags every chunk with its source id (so the vector store
+    can tell which chunks changed between runs) and any extra metadata.
+    `header` (e.g. the repo name or URL) is prepended to every chunk so each one
+    carries its provenance; duplicates are detected on the body alone.
+    When this document's copy of a duplicate displaces one emitted earlier, a
+    {'source', 'text', 'retract': True} entry withdraws the earlier chunk.
+    """
+    chunker = chunker or Chunker()
+    reserved = chunker.count_tokens(header) + 1 if header else 0
     chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
+    for position, body in enumerate(_chunk_text(text, chunker, reserved)):
+        chunk_text = f"{header}\n{body}" if header else body
+        if dedup is not None:
+            keep, displaced = dedup.add(body, (source, position, chunk_text))
+            if displaced is not None:
+                displaced_source, _, displaced_text = displaced
+                chunks.append({"source": displaced_source, "text": displaced_text, "retract": True})
+            if not keep:
+                continue
+        chunks.append({"source": source, "text": chunk_text, "metadata": metadata})
     return chunks
 
 
-def run_data_pipeline(reindex: bool = False):
+# Marks the end of a stage's output on its queue
+_DONE = object()
+
+
+class StageStats:
+    """
+    Thread-safe wall time and item counts per pipeline stage.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = {}
+        self.items: Dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float, items: int):
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.items[stage] = self.items.get(stage, 0) + items
+        PIPELINE_STAGE_SECONDS.observe(seconds, stage=stage)
+        PIPELINE_STAGE_ITEMS.inc(items, stage=stage)
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(
+                f"{stage}: {self.items.get(stage, 0)} items in {seconds:.2f}s"
+                for stage, seconds in self.seconds.items()
+            )
+
+    def as_dict(self) -> Dict[str, dict]:
+        """Per-stage item counts and milliseconds, for structured (JSON) log records."""
+        with self._lock:
+            return {
+                stage: {"items": self.items.get(stage, 0), "ms": round(seconds * 1000, 1)}
+                for stage, seconds in self.seconds.items()
+            }
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocks until `item` fits in the bounded queue. Returns False if the pipeline was stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _github_documents(github_service: GitHubService) -> Iterator[dict]:
+    for repo in github_service.iter_detailed_repos():
+        repo_text = (
+            f"Repository: {repo.get('name', 'N/A')}\n"
+            f"Description: {repo.get('description', 'N/A')}\n"
+            f"Link: {repo.get('html_url', 'N/A')}\n"
+            f"Total stars: {repo.get('stargazers_count', 'N/A')}\n"
+            f"Is it private: {repo.get('private', 'N/A')}\n"
+            f"README:\n{repo.get('readme_content', 'No README found.')}\n"
+        )
+        yield {"source": f"github:{repo.get('name', 'N/A')}", "text": repo_text,
+               "header": f"Repository: {repo.get('name', 'N/A')}",
+               "metadata": {"repo": repo.get('name', 'N/A')}}
+
+
+def _pdf_documents(pdf_services: List[PDFService]) -> Iterator[dict]:
+    # Resume and any extra PDFs, one document per page as pages are extracted
+    for pdf_service in pdf_services:
+        for page_no, page_text in pdf_service.iter_pages():
+            yield {"source": f"pdf:{pdf_service.url}#page={page_no}", "text": page_text,
+                   "header": f"Source: {pdf_service.url} (page {page_no})",
+                   "metadata": {"url": pdf_service.url, "page": page_no}}
+
+
+def _website_documents(scraping_service: ScrapingService) -> Iterator[dict]:
+    # The whole crawl is collected first so boilerplate shared between pages can be
+    # found, and sorted so the documents don't depend on the order pages finished in
+    pages = sorted((page['url'], page['text']) for page in scraping_service.iter_pages())
+    pages, shared = split_shared_lines(pages)
+    if shared:
+        yield {"source": "website:shared", "text": "\n\n".join(shared),
+               "header": f"--- Content shared across the pages of {scraping_service.root_url} ---",
+               "metadata": {"url": scraping_service.root_url}}
+    for url, text in pages:
+        if not text:
+            continue
+        # Scraped text has one block per line; as paragraphs they become chunk boundaries
+        yield {"source": f"website:{url}", "text": text.replace("\n", "\n\n"),
+               "header": f"--- Content from {url} ---",
+               "metadata": {"url": url}}
+
+
+def _fetch_stage(name: str, documents: Callable[[], Iterable[dict]], is_complete: Callable[[], bool],
+                 out_queue: queue.Queue, complete_sources: set, stop: threading.Event, stats: StageStats):
+    """
+    Runs one source in its own thread, pushing its documents into the chunking queue.
+    The source is added to `complete_sources` only if it was fetched to the end
+    without errors (`is_complete()` reports errors the service recovered from).
+    """
+    start, count, finished = time.perf_counter(), 0, False
+    try:
+        for document in documents():
+            if not _put(out_queue, document, stop):
+                return
+            count += 1
+        finished = True
+    except Exception as e:
+        logger.error(f"Error fetching {name} data: {e}", exc_info=True)
+    finally:
+        stats.record(f"fetch:{name}", time.perf_counter() - start, count)
+        logger.info(f"Finished fetching {name} data ({count} documents).")
+        if finished and is_complete():
+            complete_sources.add(name)
+        else:
+            logger.warning(f"The {name} fetch was incomplete. Its previously indexed chunks are kept.")
+        _put(out_queue, _DONE, stop)
+
+
+def _chunk_stage(in_queue: queue.Queue, out_queue: queue.Queue, producers: int, chunker: Chunker,
+                 dedup: ChunkDeduplicator, fetched_sources: set, stop: threading.Event, stats: StageStats):
+    """Chunks and de-duplicates documents as they arrive until every fetch stage has finished."""
+    busy, count, finished = 0.0, 0, 0
+    try:
+        while finished < producers and not stop.is_set():
+            try:
+                document = in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if document is _DONE:
+                finished += 1
+                continue
+            start = time.perf_counter()
+            chunks = _make_chunks(document["source"], document["text"], document["header"],
+                                  chunker, dedup, **document["metadata"])
+            busy += time.perf_counter() - start
+            if chunks:
+                # Source kinds that returned data; stale chunks are only pruned for these
+                fetched_sources.add(document["source"].split(":", 1)[0])
+            for chunk in chunks:
+                if not _put(out_queue, chunk, stop):
+                    return
+                count += 0 if chunk.get("retract") else 1
+    finally:
+        stats.record("chunk", busy, count)
+        logger.info(f"Dropped {dedup.exact_duplicates} exact and {dedup.near_duplicates} near-duplicate chunks.")
+        _put(out_queue, _DONE, stop)
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator[dict]:
+    """Yields items from a stage queue until the upstream stage signals it is done."""
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def run_data_pipeline(reindex: bool = False, vector_store: VectorStoreService = None) -> Optional[Dict[str, dict]]:
     """
     Orchestrates the fetching and processing of data and builds the vector index.
+    On a re-index only new or changed chunks are embedded.
+
+    Pass the live `vector_store` to reuse its embedding model and publish the new
+    index straight into it; otherwise a store sharing the process-wide model is used.
+    Returns the per-stage timings of a re-index ({} when the existing index was
+    loaded instead, None if the run failed).
     """
     logger.info("Initializing services for data pipeline...")
     try:
-        github_service = GitHubService(Config.GITHUB_PAT)
-        pdf_service = PDFService(Config.RESUME_URL)
-        scraping_service = ScrapingService(Config.WEBSITE_URL) # <-- Initialize new service
-        vector_store = VectorStoreService()
+        github_service = GitHubService(
+            Config.GITHUB_PAT,
+            base_url=Config.GITHUB_API_URL,
+            max_workers=Config.GITHUB_MAX_WORKERS,
+            cache_file=os.path.join(Config.DATA_PATH, 'github_cache.json'),
+            use_graphql=Config.GITHUB_USE_GRAPHQL,
+        )
+        http_cache = HttpCache(os.path.join(Config.DATA_PATH, 'http_cache.db'), max_bytes=Config.HTTP_CACHE_MAX_BYTES)
+        pdf_services = [
+            PDFService(url, http_cache=http_cache, max_workers=Config.PDF_WORKERS,
+                       parallel_min_pages=Config.PDF_PARALLEL_MIN_PAGES)
+            for url in [Config.RESUME_URL, *Config.PDF_URLS] if url
+        ]
+        scraping_service = ScrapingService(
+            Config.WEBSITE_URL,
+            max_pages=Config.CRAWL_MAX_PAGES,
+            max_depth=Config.CRAWL_MAX_DEPTH,
+            max_workers=Config.CRAWL_MAX_WORKERS,
+            per_host_concurrency=Config.CRAWL_PER_HOST_CONCURRENCY,
+            delay=Config.CRAWL_DELAY_SECONDS,
+            respect_robots=Config.CRAWL_RESPECT_ROBOTS,
+            http_cache=http_cache,
+        )
+        vector_store = vector_store or VectorStoreService()
     except Exception as e:
         logger.error(f"Error initializing services: {e}", exc_info=True)
         return
 
-    if reindex or not os.path.exists(vector_store.index_file):
+    stage_timings: Dict[str, dict] = {}
+    if reindex or not vector_store.has_index():
         logger.info("Starting full data re-indexing...")
+        # fetch (one thread per source) -> documents queue -> chunk -> chunks queue -> batched embed
+        stop = threading.Event()
+        stats = StageStats()
+        fetched_sources, complete_sources = set(), set()
+        documents = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        chunks = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        # name -> (document generator, whether the service finished without errors)
+        sources = {
+            "github": (lambda: _github_documents(github_service), lambda: github_service.complete),
+            "pdf": (lambda: _pdf_documents(pdf_services), lambda: all(pdf.complete for pdf in pdf_services)),
+            "website": (lambda: _website_documents(scraping_service), lambda: scraping_service.complete),
+        }
+        threads = [
+            threading.Thread(target=_fetch_stage,
+                             args=(name, fetch, is_complete, documents, complete_sources, stop, stats),
+                             name=f"pipeline-fetch-{name}", daemon=True)
+            for name, (fetch, is_complete) in sources.items()
+        ]
+        chunker = Chunker(make_token_counter(vector_store.model), Config.CHUNK_MAX_TOKENS, Config.CHUNK_OVERLAP_TOKENS)
+        dedup = ChunkDeduplicator(Config.CHUNK_DEDUP_THRESHOLD)
+        threads.append(threading.Thread(
+            target=_chunk_stage, args=(documents, chunks, len(sources), chunker, dedup, fetched_sources, stop, stats),
+            name="pipeline-chunk", daemon=True,
+        ))
+        started = time.perf_counter()
         try:
-            # --- Data Fetching ---
             logger.info("Fetching data from all sources...")
-            github_data = github_service.fetch_all_detailed_repos()
-            pdf_text = pdf_service.process_pdf()
-            website_text = scraping_service.crawl_website() # <-- Fetch website data
-            logger.info("Data fetching complete.")
-
-            # --- Data Processing and Chunking ---
-            all_text_data = []
-            
-            # Process GitHub Data
-            logger.info("Processing and chunking GitHub data...")
-            for repo in github_data:
-                repo_text = (
-                    f"Repository: {repo.get('name', 'N/A')}\n"
-                    f"Description: {repo.get('description', 'N/A')}\n"
-                    f"Link: {repo.get('html_url', 'N/A')}\n"
-                    f"Total stars: {repo.get('stargazers_count', 'N/A')}\n"
-                    f"Is it private: {repo.get('private', 'N/A')}\n"
-                    f"README: {repo.get('readme_content', 'No README found.')}\n"
-                )
-                if repo_text.strip():
-                    all_text_data.extend(_chunk_text(repo_text))
-            logger.info("GitHub data processed.")
-
-            # Process PDF Resume Data
-            logger.info("Processing and chunking PDF resume data...")
-            if pdf_text and pdf_text.strip():
-                all_text_data.extend(_chunk_text(pdf_text))
-            logger.info("PDF resume data processed.")
-
-            # Process Scraped Website Data
-            logger.info("Processing and chunking scraped website data...")
-            if website_text and website_text.strip():
-                all_text_data.extend(_chunk_text(website_text))
-            logger.info("Scraped website data processed.")
+            for thread in threads:
+                thread.start()
 
+            # Load the previous index and manifest so only the changes get embedded
+            if vector_store.index is None:
+                vector_store.load_index()
 
             # --- Vector Index Creation ---
-            if all_text_data:
-                vector_store.create_and_save_index(all_text_data)
-            else:
-                logger.warning("No text data was processed. Vector index not created.")
+            # Embedding runs on this thread, in batches, while the sources are still being fetched
+            embed_start = time.perf_counter()
+            # Stale chunks are only pruned for sources fetched completely, so a failed
+            # or partial fetch never deletes data that is already indexed
+            vector_store.update_index(
+                _drain(chunks, stop),
+                prune=lambda source: source.split(":", 1)[0] in fetched_sources & complete_sources,
+            )
+            stats.record("embed+index", time.perf_counter() - embed_start, stats.items.get("chunk", 0))
+            if not fetched_sources:
+                logger.warning("No text data was processed. Vector index not updated.")
+            cache_stats = http_cache.stats()
+            HTTP_CACHE_HIT_RATIO.set(cache_stats["hit_rate"])
+            logger.info(f"HTTP cache stats: {cache_stats}")
 
         except Exception as e:
             logger.error(f"An error occurred during data fetching and indexing: {e}", exc_info=True)
             return
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            total = time.perf_counter() - started
+            PIPELINE_STAGE_SECONDS.observe(total, stage="total")
+            stage_timings = dict(stats.as_dict(), total={"ms": round(total * 1000, 1)})
+            logger.info(
+                f"Pipeline stage timings: {stats.summary()}; total {total:.2f}s",
+                extra={"stages": stats.as_dict(), "duration_ms": round(total * 1000, 1)},
+            )
     else:
         logger.info("Loading existing vector index.")
-        vector_store.load_index()
+        if vector_store.index is None:
+            vector_store.load_index()
 
-    logger.info("Data pipeline complete. The vector index is ready.")
\ No newline at end of file
+    logger.info("Data pipeline complete. The vector index is ready.")
+    return stage_timings
@@ -1,10 +1,13 @@
 import os
 import sys
-import re
 import logging # <-- Import logging
-from fastapi import FastAPI, Request, HTTPException, Security, BackgroundTasks
+from datetime import datetime
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import FastAPI, Request, HTTPException, Security, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import APIKeyHeader
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -18,32 +21,50 @@ if project_root not in sys.path:
 
 from app.config import Config
 from app.services.bot_service import BotService
+from app.services.gemini_service import StreamInterruptedError
+from app.services import rate_limit_storage  # noqa: F401 -- registers the sqlite:// limiter storage
+from app.services.log_reader import LEVELS, LogPage, LogReader
+from app.services.log_setup import RequestContextMiddleware, setup_logging
+from app.services.metrics import REGISTRY
 
 # --- Initialize Config FIRST ---
 Config.initialize_paths(project_root)
 
 # --- Logging Configuration ---
-# This is the new, correct location for the logging setup.
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        # Use Config.LOG_FILE and mode 'a' to append to the log file
-        logging.FileHandler(Config.LOG_FILE, mode='a') 
-    ]
-)
+# Records go through a queue to a background thread that writes stdout and the rotating log file.
+setup_logging(Config)
 logger = logging.getLogger(__name__)
 
 # --- Initialize Services ---
 Config.validate()
 bot_service = BotService(Config)
 
+# --- Metrics (read from the services at scrape time) ---
+REGISTRY.gauge('app_sessions_live', "Chat sessions currently held by the session store.",
+               function=lambda: {(): bot_service.sessions.stats()["live_sessions"]})
+REGISTRY.gauge('app_session_events_total', "Session store events: created, truncated and evicted sessions.", ['event'],
+               type_name='counter',
+               function=lambda: {(event,): value for event, value in bot_service.sessions.stats().items()
+                                 if event != "live_sessions"})
+REGISTRY.gauge('app_cache_hit_ratio', "Hit ratio of the retrieval and answer caches.", ['cache'],
+               function=lambda: {(name,): stats["hit_rate"] for name, stats in bot_service.cache_stats().items()})
+REGISTRY.gauge('app_cache_lookups_total', "Retrieval and answer cache lookups by result.", ['cache', 'result'], type_name='counter',
+               function=lambda: {
+                   (name, result): stats[key]
+                   for name, stats in bot_service.cache_stats().items()
+                   for result, key in (("hit", "hits"), ("miss", "misses"))
+               })
+REGISTRY.gauge('app_cache_entries', "Entries held by the retrieval and answer caches.", ['cache'],
+               function=lambda: {(name,): stats["size"] for name, stats in bot_service.cache_stats().items()})
+REGISTRY.gauge('app_vector_index_size', "Live vector index size: chunks, snapshot version and bytes on disk.", ['measure'],
+               function=lambda: {(measure,): value for measure, value in bot_service.vector_store.index_stats().items()})
+
 # --- FastAPI App Setup ---
 app = FastAPI(title="Personal AI Assistant API")
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=Config.RATE_LIMIT_STORAGE_URI)
 app.state.limiter = limiter
+app.add_middleware(RequestContextMiddleware)
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # --- Security Setup ---
@@ -61,25 +82,36 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
-# --- Log Parsing Function ---
-def parse_log_file():
-    """Parses the application log file and returns a list of log entries."""
-    logs = []
-    log_pattern = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - ([\w.]+) - (\w+) - (.+)")
+# --- Server-Sent Events Helper ---
+def format_sse(data: str, event: str = None) -> str:
+    """Formats a piece of text as a single Server-Sent Event."""
+    lines = [f"event: {event}"] if event else []
+    # Multi-line payloads need one 'data:' field per line
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+# --- Log Reading ---
+log_reader = LogReader(Config.LOG_FILE)
+
+
+def _parse_time_filter(value: Optional[str]) -> Optional[float]:
+    """Converts a datetime-local form value (YYYY-MM-DDTHH:MM[:SS]) to epoch seconds."""
+    if not value:
+        return None
     try:
-        with open(Config.LOG_FILE, 'r') as f:
-            for line in f:
-                match = log_pattern.match(line)
-                if match:
-                    logs.append({
-                        "timestamp": match.group(1),
-                        "module": match.group(2),
-                        "level": match.group(3),
-                        "message": match.group(4)
-                    })
-    except FileNotFoundError:
-        logger.warning("Log file not found. It will be created upon first log event.")
-    return sorted(logs, key=lambda x: x['timestamp'], reverse=True)
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time filter: {value}")
+
+
+def parse_log_file(before: Optional[int] = None, limit: int = 50, level: Optional[str] = None,
+                   module: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> LogPage:
+    """Returns one page of log entries, newest first, read from the end of the log file."""
+    return log_reader.page(
+        before=before, limit=limit, level=level, module=module,
+        since=_parse_time_filter(since), until=_parse_time_filter(until),
+    )
 
 
 # --- API Endpoints ---
@@ -91,6 +123,12 @@ async def startup_event():
     logger.info("Data setup complete. The bot is ready to serve requests.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """On server shutdown, resolve pending searches before the executor goes away."""
+    await bot_service.vector_store.shutdown()
+
+
 @app.post("/chat", response_model=ChatResponse)
 @limiter.limit("20/minute")
 async def chat_with_bot(request: Request, chat_request: ChatRequest):
@@ -100,8 +138,8 @@ async def chat_with_bot(request: Request, chat_request: ChatRequest):
         if not session_id:
             raise HTTPException(status_code=400, detail="Could not identify client address.")
 
-        logger.info(f"Received query: '{chat_request.query}' from session (IP): {session_id}")
-        response_text = bot_service.ask(chat_request.query, session_id)
+        logger.debug(f"Received query: '{chat_request.query}' from session (IP): {session_id}")
+        response_text = await bot_service.ask(chat_request.query, session_id)
         
         return ChatResponse(response=response_text)
     except Exception as e:
@@ -109,6 +147,35 @@ async def chat_with_bot(request: Request, chat_request: ChatRequest):
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
 
+@app.post("/chat/stream")
+@limiter.limit("20/minute")
+async def chat_with_bot_stream(request: Request, chat_request: ChatRequest):
+    """Streams the assistant's reply token-by-token as Server-Sent Events."""
+    session_id = get_remote_address(request)
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Could not identify client address.")
+
+    logger.debug(f"Received streaming query: '{chat_request.query}' from session (IP): {session_id}")
+
+    async def event_stream():
+        try:
+            async for chunk in bot_service.ask_stream(chat_request.query, session_id):
+                yield format_sse(chunk)
+        except StreamInterruptedError:
+            # Already logged; the client discards the partial answer
+            yield format_sse("The response was interrupted. Please try again.", event="error")
+        except Exception as e:
+            logger.error(f"An error occurred while streaming chat response: {e}", exc_info=True)
+            yield format_sse("An internal server error occurred.", event="error")
+        yield format_sse("", event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/update-context", status_code=202)
 async def update_context(background_tasks: BackgroundTasks, api_key: str = Security(get_api_key)):
     """Triggers a full data pipeline refresh in the background."""
@@ -118,15 +185,35 @@ async def update_context(background_tasks: BackgroundTasks, api_key: str = Secur
     return {"message": "Context update initiated. The process is running in the background."}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Exposes per-stage latency quantiles, cache, session and index metrics in the Prometheus text format."""
+    body = await run_in_threadpool(REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/logs", response_class=HTMLResponse)
-async def view_logs(request: Request):
-    """Displays the application logs in a formatted HTML table."""
+async def view_logs(request: Request, before: Optional[int] = None, limit: int = Query(50, ge=1, le=500),
+                    level: Optional[str] = None, module: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None):
+    """Displays one page of the application logs (newest first) in a formatted HTML table."""
     logger.info(f"Log page accessed by {request.client.host}")
-    logs = parse_log_file()
-    return templates.TemplateResponse("logs.html", {"request": request, "logs": logs})
+    page = await run_in_threadpool(parse_log_file, before, limit, level, module, since, until)
+    filters = {"limit": limit, "level": level or "", "module": module or "", "since": since or "", "until": until or ""}
+    next_query = None
+    if page.next_cursor is not None:
+        next_query = urlencode({**{k: v for k, v in filters.items() if v}, "before": page.next_cursor})
+    return templates.TemplateResponse("logs.html", {
+        "request": request,
+        "logs": page.entries,
+        "total": page.total,
+        "filters": filters,
+        "levels": LEVELS,
+        "next_query": next_query,
+    })
 
 
 @app.get("/health", response_model=dict)
 async def health_check(request: Request):
     """A simple health check endpoint."""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok", "sessions": bot_service.sessions.stats()}
\ No newline at end of file
@@ -0,0 +1,164 @@
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from app.services.vector_store.bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+_SMALL_TALK_RE = re.compile(
+    r"^(hi+|hey+|hello+|yo|sup|hiya|howdy|good (morning|afternoon|evening|night)|"
+    r"thanks?( you)?|thank you|thx|ty|ok(ay)?|cool|nice|great|lol|lmao|haha+|bye|goodbye|see ya|"
+    r"how are you|how('s| is) it going|what'?s up|wass?up|who are you|what are you)\b",
+    re.IGNORECASE,
+)
+_ROAST_RE = re.compile(
+    r"\b(stupid|dumb|idiot|moron|useless|trash|garbage|sucks?|suck(ed|ing)|lame|loser|clown|"
+    r"shut up|hate|worst|pathetic|boring|bad (developer|dev|coder|programmer|bot)|roast)\b",
+    re.IGNORECASE,
+)
+
+
+def classify_query(query: str) -> str:
+    """
+    Sorts a message into 'roast', 'small_talk' or 'question'. Only questions are
+    worth caching: banter and greetings are meant to get a different reply each time.
+    """
+    text = query.strip()
+    if _ROAST_RE.search(text):
+        return 'roast'
+    words = len(text.split())
+    # A greeting may carry a short tail ('hey there, how are you'), not a real question
+    if words < 3 or (_SMALL_TALK_RE.match(text) and words <= 5):
+        return 'small_talk'
+    return 'question'
+
+
+def _salient_terms(query: str) -> FrozenSet[str]:
+    """
+    Names that two otherwise similar questions must share to have the same answer:
+    identifiers with digits or separators ('project-2', 'node.js') and capitalised
+    words after the first. Sentence embeddings barely tell 'What is repo-1?' from
+    'What is repo-2?', so these are compared exactly.
+    """
+    names = {term for term in tokenize(query) if re.search(r'[0-9._+#-]', term)}
+    words = re.findall(r"[A-Za-z][\w.+#-]*", query)
+    names.update(word.lower() for word in words[1:] if word[0].isupper())
+    return frozenset(names)
+
+
+class SemanticAnswerCache:
+    """
+    Caches answers to first-turn questions, keyed by query embedding: a new question
+    reuses an answer when its cosine similarity to a cached question is at least
+    `threshold` and both mention the same names. Entries belong to one index version
+    and are all dropped when the index is republished. Least recently used entries
+    are evicted beyond `max_entries`; entries older than `ttl_seconds` (0 = never) expire.
+    Embeddings are expected to be L2-normalised.
+    """
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95, ttl_seconds: float = 0):
+        self.max_entries = max(max_entries, 1)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # slot -> (question, salient terms, answer, stored at); ordered least recently used first
+        self._entries: "OrderedDict[int, Tuple[str, FrozenSet[str], str, float]]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _check_version_locked(self, version: int):
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Index version changed ({self._version} -> {version}). Dropping cached answers.")
+            self._clear_locked()
+            self._version = version
+
+    def _drop_locked(self, slot: int):
+        del self._entries[slot]
+        self._free_slots.append(slot)
+
+    def get(self, query: str, embedding: np.ndarray, version: int) -> Optional[str]:
+        """Returns a cached answer for a question close enough to `query`, or None."""
+        with self._lock:
+            if self._version is not None and version < self._version:
+                # A request still on a replaced index; the cache already belongs to a newer one
+                self.misses += 1
+                return None
+            self._check_version_locked(version)
+            if self.ttl_seconds > 0:
+                cutoff = time.time() - self.ttl_seconds
+                for slot in [s for s, entry in self._entries.items() if entry[3] < cutoff]:
+                    self._drop_locked(slot)
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            similarities = self._vectors[slots] @ embedding
+            terms = _salient_terms(query)
+            for position in np.argsort(-similarities):
+                if similarities[position] < self.threshold:
+                    break
+                slot = int(slots[position])
+                question, cached_terms, answer, _ = self._entries[slot]
+                if cached_terms == terms:
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    logger.debug(f"Answer cache hit ({similarities[position]:.3f}) for a question like: '{question}'")
+                    return answer
+            self.misses += 1
+            return None
+
+    def put(self, query: str, embedding: np.ndarray, version: int, answer: str):
+        """Stores the answer to `query`, evicting the least recently used entry when full."""
+        with self._lock:
+            if self._version is not None and version < self._version:
+                # Answered from an index that has since been replaced
+                return
+            self._check_version_locked(version)
+            if self._vectors is None or self._vectors.shape[1] != embedding.shape[0]:
+                self._vectors = np.zeros((self.max_entries, embedding.shape[0]), dtype='float32')
+                self._clear_locked()
+            if not self._free_slots:
+                self._drop_locked(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._vectors[slot] = embedding
+            self._entries[slot] = (query, _salient_terms(query), answer, time.time())
+
+    def record_skip(self):
+        """Counts a message that was not eligible for caching (follow-up, roast or small talk)."""
+        with self._lock:
+            self.skipped += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the size and hit/miss counters of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,9 +1,16 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from app.config import Config
 from app.services.gemini_service import GeminiService
 from app.services.vector_store.vector_store_service import VectorStoreService
+from app.services.session_service import SessionManager
+from app.services.session_store import create_session_store
+from app.services.log_setup import timed_stage
+from app.services.answer_cache import SemanticAnswerCache, classify_query
 from app.pipelines.data_pipeline import run_data_pipeline
-from typing import Dict, Tuple
+from typing import AsyncIterator, Dict, Optional, Tuple
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +23,117 @@ class BotService:
         self.config = config
         self.vector_store = VectorStoreService()
         self.gemini_service = GeminiService(config.GEMINI_API_KEY, self.vector_store)
-        self.sessions = {} # In-memory dictionary to store chat sessions
+        self.sessions = SessionManager(
+            store=create_session_store(config),
+            max_turns=config.SESSION_MAX_TURNS,
+            max_history_tokens=config.SESSION_MAX_HISTORY_TOKENS,
+        )
+        # Caps the number of chats in flight per worker; extra requests wait their turn
+        self.chat_semaphore = asyncio.Semaphore(config.CHAT_MAX_CONCURRENCY)
+        # Opt-in reuse of answers to repeated first-turn questions (per worker process)
+        self.answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                config.ANSWER_CACHE_SIZE, config.ANSWER_CACHE_SIMILARITY, config.ANSWER_CACHE_TTL_SECONDS
+            )
         logger.info("Bot Service initialized successfully.")
 
     def setup_data(self, reindex: bool = False):
-        """Runs the data pipeline and ensures the vector store is loaded."""
+        """Runs the data pipeline against the live vector store and ensures it is loaded."""
         logger.info("Bot service is triggering the data pipeline.")
-        run_data_pipeline(reindex)
-        logger.info("Loading vector index into the bot's memory...")
-        self.vector_store.load_index()
+        # The pipeline reuses our embedding model and swaps the new index in directly
+        run_data_pipeline(reindex, vector_store=self.vector_store)
+        if self.vector_store.index is None:
+            logger.info("Loading vector index into the bot's memory...")
+            self.vector_store.load_index()
+
+    @asynccontextmanager
+    async def _chat_slot(self):
+        """Holds one of the CHAT_MAX_CONCURRENCY slots, timing how long the request waited for it."""
+        with timed_stage("chat_slot_wait"):
+            await self.chat_semaphore.acquire()
+        try:
+            yield
+        finally:
+            self.chat_semaphore.release()
+
+    async def _lookup_answer(self, user_query: str, history: list) -> Tuple[Optional[Tuple[np.ndarray, int]], Optional[str]]:
+        """
+        Checks the answer cache for a first-turn question. Returns (cache key, cached answer):
+        the key is None when the message must not be cached (follow-ups, roasts, small talk),
+        and the answer is None on a miss.
+        """
+        if self.answer_cache is None:
+            return None, None
+        if history or classify_query(user_query) != 'question':
+            self.answer_cache.record_skip()
+            return None, None
+        with timed_stage("answer_cache_lookup"):
+            # Also warms the query embedding cache that retrieval uses on a miss
+            embedding = await self.vector_store.embed_query_async(user_query)
+            key = (embedding, self.vector_store.index_version)
+            return key, self.answer_cache.get(user_query, *key)
+
+    def cache_stats(self) -> Dict[str, dict]:
+        """Returns hit/miss counters for the retrieval caches and, when enabled, the answer cache."""
+        stats = self.vector_store.cache_stats()
+        if self.answer_cache is not None:
+            stats["answer"] = self.answer_cache.stats()
+        return stats
 
     def get_greeting(self) -> str:
         """Gets a dynamic, AI-generated greeting."""
         return self.gemini_service.generate_greeting()
 
-    def ask(self, user_query: str, session_id: str) -> str:
+    async def ask(self, user_query: str, session_id: str) -> str:
         """
         Handles user queries using a session_id to maintain conversation history.
         """
-        # Get or create a chat session for the user
-        if session_id not in self.sessions:
-            logger.info(f"Creating new chat session for session_id: {session_id}")
-            self.sessions[session_id] = self.gemini_service.start_new_chat()
-        
-        current_session = self.sessions[session_id]
-
-        logger.info(f"Forwarding query to Gemini Service for session: {session_id}")
-        return self.gemini_service.chat(user_query, current_session)
\ No newline at end of file
+        with timed_stage("session_load"):
+            history = self.sessions.load(session_id)
+        cache_key, cached = await self._lookup_answer(user_query, history)
+        if cached is not None:
+            with timed_stage("session_save"):
+                self.sessions.append_turn(session_id, history, user_query, cached)
+            return cached
+        chat_session = self.gemini_service.start_new_chat(history)
+
+        async with self._chat_slot():
+            logger.debug(f"Forwarding query to Gemini Service for session: {session_id}")
+            response = await self.gemini_service.chat(user_query, chat_session)
+
+        if self.gemini_service.turn_completed(chat_session, len(history)):
+            with timed_stage("session_save"):
+                self.sessions.append_turn(session_id, history, user_query, response)
+            # Only answers Gemini actually completed are cached, never the fallback messages
+            if cache_key is not None:
+                self.answer_cache.put(user_query, *cache_key, response)
+        return response
+
+    async def ask_stream(self, user_query: str, session_id: str) -> AsyncIterator[str]:
+        """
+        Same as ask(), but yields the response in chunks as it is generated.
+        """
+        with timed_stage("session_load"):
+            history = self.sessions.load(session_id)
+        cache_key, cached = await self._lookup_answer(user_query, history)
+        if cached is not None:
+            yield cached
+            with timed_stage("session_save"):
+                self.sessions.append_turn(session_id, history, user_query, cached)
+            return
+        chat_session = self.gemini_service.start_new_chat(history)
+        chunks = []
+
+        # A StreamInterruptedError propagates from here, so a broken turn is never saved
+        async with self._chat_slot():
+            logger.debug(f"Forwarding streaming query to Gemini Service for session: {session_id}")
+            async for chunk in self.gemini_service.chat_stream(user_query, chat_session):
+                chunks.append(chunk)
+                yield chunk
+
+        if self.gemini_service.turn_completed(chat_session, len(history)):
+            with timed_stage("session_save"):
+                self.sessions.append_turn(session_id, history, user_query, "".join(chunks).strip())
+            if cache_key is not None:
+                self.answer_cache.put(user_query, *cache_key, "".join(chunks).strip())
\ No newline at end of file
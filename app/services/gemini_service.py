@@ -1,10 +1,17 @@
 import google.generativeai as genai
 import logging
-from typing import List, Union
+from typing import AsyncIterator, List, Union
+from app.config import Config
+from app.services.log_setup import timed_stage
 from .vector_store.vector_store_service import VectorStoreService
 
 logger = logging.getLogger(__name__)
 
+
+class StreamInterruptedError(Exception):
+    """Raised when a streamed answer fails after part of it has already been sent."""
+
+
 class GeminiService:
     """
     Handles conversational interactions using the Gemini API and a vector store for context.
@@ -75,29 +82,48 @@ class GeminiService:
             {'role': 'model', 'parts': ["Okay, I understand. I will act as Parth Sali's witty and loyal AI assistant, and all my responses will be in plain text. Let's begin."]}
         ]
 
-    def start_new_chat(self):
-        """Starts a new chat session, initialized with the system prompt."""
-        initial_history = self._create_system_prompt_history()
+    def start_new_chat(self, history: List[dict] = None):
+        """
+        Starts a chat session initialized with the system prompt, followed by any
+        previously stored conversation history.
+        """
+        initial_history = self._create_system_prompt_history() + list(history or [])
         return self.model.start_chat(history=initial_history)
 
-    def chat(self, user_query: str, chat_session) -> str:
+    def turn_completed(self, chat_session, stored_turns: int) -> bool:
+        """Checks whether the last message sent on the session was answered and recorded."""
+        try:
+            return len(chat_session.history) > len(self._create_system_prompt_history()) + stored_turns
+        except Exception:
+            # The SDK refuses to build a history after a broken stream
+            return False
+
+    def _build_prompt(self, user_query: str, context_chunks: List[str]) -> str:
+        """Wraps the user's question with the retrieved context."""
+        return (
+            f"Okay, based on the following context, answer the user's question.\n\n"
+            f"Context:\n{'---'.join(context_chunks)}\n\n"
+            f"User's Question: {user_query}"
+        )
+
+    async def chat(self, user_query: str, chat_session) -> str:
         """
         Performs a contextual chat using a provided chat session object.
+        Retrieval runs in the vector store's executor and generation uses the SDK's async API.
         """
-        logger.info(f"Processing query for an existing chat session...")
+        logger.debug(f"Processing query for an existing chat session...")
         try:
-            context_chunks = self.vector_store.search(user_query, k=5)
+            with timed_stage("retrieval"):
+                context_chunks = await self.vector_store.search_async(user_query, k=Config.RETRIEVAL_TOP_K)
             logger.debug(f"Retrieved context chunks:\n{context_chunks}")
 
-            prompt_with_context = (
-                f"Okay, based on the following context, answer the user's question.\n\n"
-                f"Context:\n{'---'.join(context_chunks)}\n\n"
-                f"User's Question: {user_query}"
-            )
+            with timed_stage("prompt_build"):
+                prompt_with_context = self._build_prompt(user_query, context_chunks)
 
-            logger.info("Sending prompt to Gemini API...")
-            response = chat_session.send_message(prompt_with_context)
-            logger.info("Received response from Gemini API.")
+            logger.debug("Sending prompt to Gemini API...")
+            with timed_stage("generation"):
+                response = await chat_session.send_message_async(prompt_with_context)
+            logger.debug("Received response from Gemini API.")
 
             # Clean the final output to ensure it's plain text
             return response.text.strip().replace('*', '')
@@ -106,4 +132,43 @@ class GeminiService:
             return "My vector index is taking a nap. Please try running the data pipeline again."
         except Exception as e:
             logger.error(f"An unexpected error occurred during chat: {e}", exc_info=True)
-            return "I seem to have a bug... which is embarrassing. Give me a moment and try again."
\ No newline at end of file
+            return "I seem to have a bug... which is embarrassing. Give me a moment and try again."
+
+    async def chat_stream(self, user_query: str, chat_session) -> AsyncIterator[str]:
+        """
+        Streaming variant of chat(): yields cleaned text chunks as Gemini generates them.
+        """
+        logger.debug("Processing streaming query for an existing chat session...")
+        started = False
+        try:
+            with timed_stage("retrieval"):
+                context_chunks = await self.vector_store.search_async(user_query, k=Config.RETRIEVAL_TOP_K)
+            logger.debug(f"Retrieved context chunks:\n{context_chunks}")
+
+            with timed_stage("prompt_build"):
+                prompt_with_context = self._build_prompt(user_query, context_chunks)
+
+            logger.debug("Sending streaming prompt to Gemini API...")
+            with timed_stage("generation"):
+                response = await chat_session.send_message_async(prompt_with_context, stream=True)
+
+                async for chunk in response:
+                    # Apply the same plain-text cleanup as chat(), one chunk at a time
+                    text = chunk.text.replace('*', '')
+                    if not started:
+                        text = text.lstrip()
+                    if text:
+                        started = True
+                        yield text
+            logger.debug("Finished streaming response from Gemini API.")
+        except Exception as e:
+            if started:
+                # A fallback message appended to a partial answer would read as part of it
+                logger.error(f"Streaming chat failed after output had started: {e}", exc_info=True)
+                raise StreamInterruptedError("The response was interrupted.") from e
+            if isinstance(e, RuntimeError):
+                logger.error(f"Runtime error during streaming chat: {e}", exc_info=True)
+                yield "My vector index is taking a nap. Please try running the data pipeline again."
+            else:
+                logger.error(f"An unexpected error occurred during streaming chat: {e}", exc_info=True)
+                yield "I seem to have a bug... which is embarrassing. Give me a moment and try again."
\ No newline at end of file
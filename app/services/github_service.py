@@ -1,21 +1,178 @@
-import requests
-import base64
+import os
+import json
 import time
+import base64
 import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+class RateLimitTracker:
+    """
+    Tracks GitHub's X-RateLimit-* headers and paces requests so the remaining quota
+    lasts until the window resets, instead of sleeping a fixed amount per request.
+    """
+    def __init__(self, reserve: int = 100, max_wait: float = 60.0):
+        # Below this many remaining requests, calls are spread out until the reset
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, response: requests.Response):
+        """Records the quota reported by a response."""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset_at = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset_at is None:
+            return
+        with self._lock:
+            self.remaining = int(remaining)
+            self.reset_at = float(reset_at)
+
+    def wait(self):
+        """Sleeps only when the quota is running low."""
+        with self._lock:
+            if self.remaining is None or self.remaining > self.reserve:
+                return
+            seconds_left = max(self.reset_at - time.time(), 0)
+            delay = seconds_left if self.remaining <= 0 else seconds_left / self.remaining
+            # Claim a request from the quota so concurrent workers pace themselves too
+            self.remaining -= 1
+        delay = min(delay, self.max_wait)
+        if delay > 0:
+            logger.info(f"GitHub rate limit is low, pausing for {delay:.2f}s.")
+            time.sleep(delay)
+
+
+# Repository metadata plus README blob text for up to 100 repos per request.
+# README file names vary, so the common spellings are looked up under aliases;
+# repositories matching none of them get their README from the REST endpoint.
+_REPOS_GRAPHQL_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(first: 100, after: $cursor, ownerAffiliations: OWNER) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        owner { login }
+        description
+        url
+        stargazerCount
+        isPrivate
+        readmeMd: object(expression: "HEAD:README.md") { ... on Blob { text } }
+        readmeLowerMd: object(expression: "HEAD:readme.md") { ... on Blob { text } }
+        readmeRst: object(expression: "HEAD:README.rst") { ... on Blob { text } }
+        readmeTxt: object(expression: "HEAD:README.txt") { ... on Blob { text } }
+        readmePlain: object(expression: "HEAD:README") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+_README_ALIASES = ('readmeMd', 'readmeLowerMd', 'readmeRst', 'readmeTxt', 'readmePlain')
+
+
 class GitHubService:
     """
     A service for interacting with the GitHub API to fetch repository data.
+    Responses are cached with their ETag / Last-Modified validators, so unchanged
+    pages and READMEs come back as cheap 304s on the next run.
     """
-    def __init__(self, access_token: str):
-        self.base_url = "https://api.github.com"
+    def __init__(self, access_token: str, base_url: str = "https://api.github.com",
+                 max_workers: int = 8, cache_file: Optional[str] = None, use_graphql: bool = False):
+        self.base_url = base_url.rstrip('/')
+        self.use_graphql = use_graphql
         self.headers = {
             "Authorization": f"token {access_token}",
             "Accept": "application/vnd.github.v3+json",
         }
+        self.max_workers = max(max_workers, 1)
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.rate_limit = RateLimitTracker()
+
+        self.cache_file = cache_file
+        self._cache = self._load_cache()
+        self._cache_lock = threading.Lock()
+        self.not_modified_count = 0
+        # False once a fetch stopped early or skipped a repository because of an error
+        self.complete = True
+
+    def _load_cache(self) -> dict:
+        """Loads persisted validators and bodies: {url: {'etag', 'last_modified', 'body', 'next'}}."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable GitHub cache {self.cache_file}: {e}")
+            return {}
+
+    def _save_cache(self):
+        """Persists the validator cache atomically."""
+        if not self.cache_file:
+            return
+        tmp_path = f"{self.cache_file}.tmp"
+        with self._cache_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f)
+        os.replace(tmp_path, self.cache_file)
+
+    def _conditional_get(self, url: str) -> Tuple[object, Optional[str]]:
+        """
+        GETs a JSON resource, sending cached validators. Returns (body, next_page_url).
+        A 304 returns the cached body. Secondary rate limits are retried once.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(url)
+        headers = dict(self.headers)
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        for attempt in range(2):
+            self.rate_limit.wait()
+            response = self.session.get(url, headers=headers, timeout=30)
+            self.rate_limit.update(response)
+            if response.status_code in (403, 429) and attempt == 0 and (
+                    'Retry-After' in response.headers or response.headers.get('X-RateLimit-Remaining') == '0'):
+                retry_after = float(response.headers.get('Retry-After') or
+                                    max(float(response.headers.get('X-RateLimit-Reset', time.time())) - time.time(), 1))
+                retry_after = min(retry_after, self.rate_limit.max_wait)
+                logger.warning(f"Rate limited by GitHub on {url}, retrying in {retry_after:.0f}s.")
+                time.sleep(retry_after)
+                continue
+            break
+
+        if response.status_code == 304 and cached:
+            # Pool workers share the counter; += is not atomic across threads
+            with self._cache_lock:
+                self.not_modified_count += 1
+            return cached['body'], cached.get('next')
+
+        response.raise_for_status()
+        body = response.json()
+        next_url = response.links.get('next', {}).get('url')
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': body,
+            'next': next_url,
+        }
+        if entry['etag'] or entry['last_modified']:
+            with self._cache_lock:
+                self._cache[url] = entry
+        return body, next_url
 
     def _fetch_paginated_data(self, url: str) -> list:
         """
@@ -24,12 +181,11 @@ class GitHubService:
         all_data = []
         while url:
             try:
-                response = self.session.get(url, headers=self.headers)
-                response.raise_for_status()
-                all_data.extend(response.json())
-                url = response.links.get('next', {}).get('url')
+                data, url = self._conditional_get(url)
+                all_data.extend(data)
             except requests.exceptions.RequestException as e:
                 logger.error(f"Error fetching paginated data from {url}: {e}", exc_info=True)
+                self.complete = False
                 break
         return all_data
 
@@ -43,53 +199,139 @@ class GitHubService:
         logger.info(f"Found {len(repos)} repositories.")
         return repos
 
-    def _get_repo_readme(self, owner: str, repo_name: str) -> str:
+    def _get_repo_readme(self, owner: str, repo_name: str) -> Optional[str]:
         """
         Fetches the README content for a specific repository.
+        Returns a placeholder if it has none, and None if it could not be fetched.
         """
         readme_url = f"{self.base_url}/repos/{owner}/{repo_name}/readme"
         try:
-            response = self.session.get(readme_url, headers=self.headers)
-            response.raise_for_status()
-            content = response.json()['content']
-            return base64.b64decode(content).decode('utf-8')
+            data, _ = self._conditional_get(readme_url)
+            return base64.b64decode(data['content']).decode('utf-8')
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 logger.warning(f"No README found for {owner}/{repo_name}.")
-            else:
-                logger.error(f"HTTP error fetching README for {owner}/{repo_name}: {e}", exc_info=True)
+                return "No README found."
+            logger.error(f"HTTP error fetching README for {owner}/{repo_name}: {e}", exc_info=True)
         except Exception as e:
             logger.error(f"An unexpected error occurred fetching README for {owner}/{repo_name}: {e}", exc_info=True)
-        return "No README found."
-
+        return None
 
-    def fetch_all_detailed_repos(self) -> list:
+    def _fetch_repo_details(self, repo: dict) -> Optional[dict]:
         """
-        Fetches detailed information and READMEs for all user repositories.
+        Fetches the README for one repository and builds its record. Returns None
+        (and marks the fetch incomplete) if the README could not be fetched.
         """
-        all_repos = self._get_all_user_repos()
-        detailed_repos = []
+        owner = repo['owner']['login']
+        repo_name = repo['name']
+        logger.info(f"Fetching details for repository: {owner}/{repo_name}")
+        try:
+            readme_content = self._get_repo_readme(owner, repo_name)
+            if readme_content is None:
+                # A placeholder would replace the README that is already indexed
+                self.complete = False
+                return None
+            repo_data = {
+                "name": repo.get("name", "N/A"),
+                "description": repo.get("description", "N/A"),
+                "html_url": repo.get("html_url", "N/A"),
+                "stargazers_count": repo.get("stargazers_count", "N/A"),
+                "private": repo.get("private", "N/A"),
+                "readme_content": readme_content,
+            }
+            logger.info(f"Successfully fetched details for {owner}/{repo_name}")
+            return repo_data
+        except Exception as e:
+            logger.error(f"Failed to fetch details for {owner}/{repo_name}: {e}", exc_info=True)
+            self.complete = False
+            return None
 
-        for repo in all_repos:
-            time.sleep(0.5)  # To avoid hitting rate limits
-            owner = repo['owner']['login']
-            repo_name = repo['name']
-            logger.info(f"Fetching details for repository: {owner}/{repo_name}")
+    def _graphql(self, query: str, variables: dict) -> dict:
+        """Runs a GraphQL query and returns its `data`, raising on transport or query errors."""
+        self.rate_limit.wait()
+        response = self.session.post(
+            f"{self.base_url}/graphql",
+            headers=self.headers,
+            json={"query": query, "variables": variables},
+            timeout=60,
+        )
+        self.rate_limit.update(response)
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get('errors') or not payload.get('data'):
+            raise RuntimeError(f"GraphQL query failed: {payload.get('errors')}")
+        return payload['data']
 
-            try:
-                readme_content = self._get_repo_readme(owner, repo_name)
-
-                repo_data = {
-                    "name": repo.get("name", "N/A"),
-                    "description": repo.get("description", "N/A"),
-                    "html_url": repo.get("html_url", "N/A"),
-                    "stargazers_count": repo.get("stargazers_count", "N/A"),
-                    "private": repo.get("private", "N/A"),
-                    "readme_content": readme_content,
+    def _iter_repos_via_graphql(self) -> Iterator[dict]:
+        """
+        Fetches repository metadata and README text in pages of 100 repositories,
+        i.e. one request per page instead of one per repository.
+        """
+        logger.info("Fetching repositories and READMEs via GraphQL...")
+        count, cursor = 0, None
+        while True:
+            page = self._graphql(_REPOS_GRAPHQL_QUERY, {"cursor": cursor})['viewer']['repositories']
+            for node in page['nodes']:
+                readme = next(
+                    (node[alias]['text'] for alias in _README_ALIASES if node.get(alias) and node[alias].get('text')),
+                    None,
+                )
+                if readme is None:
+                    # Only REST's /readme knows every README name GitHub recognises
+                    readme = self._get_repo_readme((node.get("owner") or {}).get("login"), node.get("name"))
+                    if readme is None:
+                        self.complete = False
+                        continue
+                count += 1
+                yield {
+                    "name": node.get("name") or "N/A",
+                    "description": node.get("description"),
+                    "html_url": node.get("url") or "N/A",
+                    "stargazers_count": node.get("stargazerCount", "N/A"),
+                    "private": node.get("isPrivate", "N/A"),
+                    "readme_content": readme,
                 }
-                detailed_repos.append(repo_data)
-                logger.info(f"Successfully fetched details for {owner}/{repo_name}")
+            if not page['pageInfo']['hasNextPage']:
+                break
+            cursor = page['pageInfo']['endCursor']
+        logger.info(f"Fetched {count} repositories via GraphQL.")
+
+    def iter_detailed_repos(self) -> Iterator[dict]:
+        """
+        Yields detailed information and the README for each user repository as it
+        is fetched, using a bounded pool of workers paced by GitHub's rate-limit headers.
+        In GraphQL mode everything comes from a few batched queries; if GraphQL fails,
+        REST fetches the repositories it had not produced yet.
+        `complete` is False afterwards if any repository may be missing.
+        """
+        self.complete = True
+        self.not_modified_count = 0
+        produced = set()
+        if self.use_graphql:
+            try:
+                for repo in self._iter_repos_via_graphql():
+                    produced.add(repo["name"])
+                    yield repo
+                self._save_cache()
+                return
             except Exception as e:
-                logger.error(f"Failed to fetch details for {owner}/{repo_name}: {e}", exc_info=True)
+                logger.warning(f"GraphQL fetch failed after {len(produced)} repositories, "
+                               f"falling back to REST for the rest: {e}", exc_info=True)
+
+        all_repos = [repo for repo in self._get_all_user_repos() if repo.get('name') not in produced]
+
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="github-fetch") as pool:
+            for repo in pool.map(self._fetch_repo_details, all_repos):
+                if repo is not None:
+                    count += 1
+                    yield repo
 
-        return detailed_repos
\ No newline at end of file
+        logger.info(f"Fetched {count} repositories ({self.not_modified_count} responses unchanged since last run).")
+        self._save_cache()
+
+    def fetch_all_detailed_repos(self) -> list:
+        """
+        Fetches detailed information and READMEs for all user repositories.
+        """
+        return list(self.iter_detailed_repos())
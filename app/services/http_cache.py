@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import logging
+import threading
+import requests
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from app.services.session_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+def download_to_file(response: requests.Response, chunk_size: int = 64 * 1024) -> Tuple[str, str]:
+    """
+    Streams a response body to a temporary file without holding it in memory.
+    Returns (path, sha256 of the body). The caller removes the file.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="download-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for block in response.iter_content(chunk_size=chunk_size):
+                digest.update(block)
+                f.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+class HttpCache:
+    """
+    An on-disk cache of parsed HTTP responses keyed by URL. Each entry keeps the
+    response's ETag / Last-Modified validators and a hash of the body, so
+    unchanged resources skip both the download (304) and the parse (same hash).
+    The total payload size is capped; least recently used entries are evicted.
+    """
+    def __init__(self, db_path: str, max_bytes: int = 100 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_hash TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access)")
+        # Running payload total, so a store doesn't have to sum the whole table
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        self.not_modified = 0
+        self.unchanged_body = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, url: str) -> Optional[Tuple[str, str, str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body_hash, payload FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _count(self, counter: str):
+        # Crawler threads record lookups concurrently
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _touch(self, url: str):
+        """Counts a 304 hit on `url` and marks the entry as recently used."""
+        with self._lock:
+            self.not_modified += 1
+            self._conn.execute("UPDATE http_cache SET last_access = ? WHERE url = ?", (time.time(), url))
+
+    def _store(self, url: str, response: requests.Response, body_hash: str, payload: Any):
+        serialized = json.dumps(payload)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM http_cache WHERE url = ?", (url,)).fetchone()
+            self._total_size += len(serialized) - (previous[0] if previous else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body_hash, payload, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 body_hash, serialized, len(serialized), time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in `max_bytes`."""
+        if self._total_size <= self.max_bytes:
+            return
+        # Resync with the table (another process may share the file) before deleting anything
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        for url, size in self._conn.execute("SELECT url, size FROM http_cache ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+            self.evictions += 1
+            total -= size
+        self._total_size = total
+
+    @staticmethod
+    def _conditional_headers(cached: Optional[tuple], headers: Optional[dict]) -> dict:
+        headers = dict(headers or {})
+        if cached:
+            etag, last_modified, _, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def fetch(self, session: requests.Session, url: str,
+              parse: Callable[[requests.Response], Any], **kwargs) -> Any:
+        """
+        GETs `url` with conditional headers and returns the parsed payload.
+        `parse` is only called when the body actually changed; a payload of None
+        is returned as-is and not cached. HTTP errors are raised to the caller.
+        """
+        cached = self._lookup(url)
+        headers = self._conditional_headers(cached, kwargs.pop('headers', None))
+
+        response = session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached:
+            self._touch(url)
+            return json.loads(cached[3])
+        response.raise_for_status()
+
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if cached and cached[2] == body_hash:
+            # Server didn't validate, but the bytes are identical: skip the parse
+            self._count('unchanged_body')
+            self._store(url, response, body_hash, json.loads(cached[3]))
+            return json.loads(cached[3])
+
+        self._count('misses')
+        payload = parse(response)
+        if payload is not None:
+            self._store(url, response, body_hash, payload)
+        return payload
+
+    def iter_file(self, session: requests.Session, url: str,
+                  parse_file: Callable[[str], Iterable], **kwargs) -> Iterator:
+        """
+        Streaming variant of fetch() for large files. The body is streamed to a temp
+        file and `parse_file(path)` yields items that are passed on as soon as they are
+        produced; the full list of items is cached once parsing completes.
+        Items must be JSON-serialisable (tuples come back from the cache as lists).
+        """
+        cached = self._lookup(url)
+        headers = self._conditional_headers(cached, kwargs.pop('headers', None))
+
+        with session.get(url, headers=headers, stream=True, **kwargs) as response:
+            if response.status_code == 304 and cached:
+                self._touch(url)
+                yield from json.loads(cached[3])
+                return
+            response.raise_for_status()
+            path, body_hash = download_to_file(response)
+
+        try:
+            if cached and cached[2] == body_hash:
+                self._count('unchanged_body')
+                items = json.loads(cached[3])
+                self._store(url, response, body_hash, items)
+                yield from items
+                return
+
+            self._count('misses')
+            items = []
+            for item in parse_file(path):
+                items.append(item)
+                yield item
+            self._store(url, response, body_hash, items)
+        finally:
+            os.remove(path)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_cache"
+            ).fetchone()
+            not_modified, unchanged_body, misses, evictions = (
+                self.not_modified, self.unchanged_body, self.misses, self.evictions
+            )
+        hits = not_modified + unchanged_body
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "not_modified": not_modified,
+            "unchanged_body": unchanged_body,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import bisect
+import struct
+import hashlib
+import logging
+import threading
+from array import array
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: index updates are only serialised within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_TEXT_ENTRY_RE = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - ([\w.]+) - (\w+) - (.*)")
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+# One index record per log entry: byte offset of its first line, timestamp (epoch seconds)
+_RECORD = struct.Struct('<Qd')
+# Bytes hashed from the start of the log to notice that it was replaced (e.g. rotated)
+_SIGNATURE_BYTES = 256
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class LogPage(NamedTuple):
+    entries: List[dict]
+    # Pass back as `before` to get the next (older) page; None when there are no older entries
+    next_cursor: Optional[int]
+    total: int
+
+
+def _parse_timestamp(value: str) -> float:
+    return time.mktime(datetime.strptime(value, _TIMESTAMP_FORMAT).timetuple()) + int(value[-3:]) / 1000
+
+
+def _parse_json_entry(line: str) -> Optional[dict]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not {"timestamp", "level", "module", "message"} <= record.keys():
+        return None
+    entry = {key: str(record.pop(key)) for key in ("timestamp", "module", "level", "message")}
+    entry["request_id"] = record.pop("request_id", None)
+    entry["time"] = record.pop("time", None)
+    details = [record.pop("exc_info", "")]
+    if record:
+        # Any structured extras (durations, status, ...) are shown with the entry
+        details.insert(0, json.dumps(record, default=str))
+    entry["details"] = "\n".join(d for d in details if d)
+    return entry
+
+
+def parse_entry_start(line: str) -> Optional[dict]:
+    """
+    Parses the first line of a log entry, in either the text or the JSON-lines format,
+    or returns None for a continuation line (e.g. a traceback).
+    """
+    if line.startswith('{'):
+        return _parse_json_entry(line)
+    match = _TEXT_ENTRY_RE.match(line)
+    if not match:
+        return None
+    return {
+        "timestamp": match.group(1),
+        "module": match.group(2),
+        "level": match.group(3),
+        "message": match.group(4),
+    }
+
+
+class LogReader:
+    """
+    Reads the application log newest-first, one page at a time.
+
+    Entry start offsets and timestamps are kept in a persisted index next to the log
+    (`<log>.idx`). Each read only indexes the bytes appended since the last one, then
+    reads the requested page's entries from the end of the file, so the cost depends
+    on the page size rather than on the size of the log. Continuation lines
+    (tracebacks logged with exc_info) stay attached to their entry. Both the text
+    format and the JSON-lines format (LOG_FORMAT=json) are understood.
+    """
+    def __init__(self, log_path: str, index_path: Optional[str] = None, max_scan: int = 5000):
+        self.log_path = log_path
+        self.index_path = index_path or f"{log_path}.idx"
+        self.meta_path = f"{self.index_path}.meta"
+        # Upper bound on entries examined for one filtered page
+        self.max_scan = max_scan
+        self._lock = threading.Lock()
+        self._offsets = array('Q')
+        self._timestamps = array('d')
+        self._meta = {"inode": None, "signature": None, "indexed_size": 0, "generation": 0}
+
+    # --- Index maintenance ---
+
+    def _signature(self, f) -> str:
+        f.seek(0)
+        return hashlib.sha1(f.read(_SIGNATURE_BYTES)).hexdigest()
+
+    def _load_meta(self) -> dict:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"inode": None, "signature": None, "indexed_size": 0, "generation": 0}
+
+    def _save_meta(self, meta: dict):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _reset(self, index_file):
+        index_file.truncate(0)
+        self._offsets = array('Q')
+        self._timestamps = array('d')
+
+    def _load_new_records(self, index_file):
+        """Picks up records appended to the index file by other processes."""
+        index_file.seek(len(self._offsets) * _RECORD.size)
+        data = index_file.read()
+        usable = len(data) - len(data) % _RECORD.size
+        for offset, timestamp in _RECORD.iter_unpack(data[:usable]):
+            self._offsets.append(offset)
+            self._timestamps.append(timestamp)
+
+    def refresh(self) -> int:
+        """Indexes entries appended to the log since the last call. Returns the entry count."""
+        with self._lock:
+            try:
+                log_file = open(self.log_path, 'rb')
+            except FileNotFoundError:
+                return 0
+            with log_file, open(self.index_path, 'a+b') as index_file:
+                if fcntl is not None:
+                    fcntl.flock(index_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh_locked(log_file, index_file)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(index_file, fcntl.LOCK_UN)
+            return len(self._offsets)
+
+    def _refresh_locked(self, log_file, index_file):
+        meta = self._load_meta()
+        stat = os.fstat(log_file.fileno())
+        signature = self._signature(log_file) if stat.st_size >= _SIGNATURE_BYTES else None
+        replaced = (
+            meta["inode"] not in (None, stat.st_ino)
+            or stat.st_size < meta["indexed_size"]
+            or (meta["signature"] and signature and meta["signature"] != signature)
+        )
+        orphaned = meta["indexed_size"] == 0 and os.fstat(index_file.fileno()).st_size > 0
+        if replaced or orphaned:
+            # The log was rotated or truncated (or the index lost its metadata): start over
+            self._reset(index_file)
+            meta = {"inode": stat.st_ino, "signature": None, "indexed_size": 0,
+                    "generation": meta.get("generation", 0) + 1}
+        if meta.get("generation", 0) != self._meta.get("generation", 0):
+            # Another process rebuilt the index since we last looked: reload it
+            self._offsets, self._timestamps = array('Q'), array('d')
+        self._load_new_records(index_file)
+
+        if stat.st_size > meta["indexed_size"]:
+            new_records, indexed_size = self._scan(log_file, meta["indexed_size"])
+            index_file.seek(0, os.SEEK_END)
+            index_file.write(b''.join(_RECORD.pack(*record) for record in new_records))
+            index_file.flush()
+            for offset, timestamp in new_records:
+                self._offsets.append(offset)
+                self._timestamps.append(timestamp)
+            meta.update(inode=stat.st_ino, signature=meta["signature"] or signature, indexed_size=indexed_size)
+        if meta != self._meta:
+            self._save_meta(meta)
+        self._meta = meta
+
+    def _scan(self, log_file, start: int) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Finds entry starts from `start` up to the last complete line.
+        Returns the (offset, timestamp) records and the position after the last complete line.
+        """
+        records = []
+        log_file.seek(start)
+        position = start
+        for raw_line in log_file:
+            if not raw_line.endswith(b'\n'):
+                # A line still being written; it is picked up next time
+                break
+            entry = parse_entry_start(raw_line.decode('utf-8', errors='replace'))
+            if entry is not None:
+                timestamp = entry.get("time")
+                records.append((position, float(timestamp) if timestamp else _parse_timestamp(entry["timestamp"])))
+            position += len(raw_line)
+        return records, position
+
+    # --- Reading ---
+
+    @staticmethod
+    def _read_entries(log_file, offsets: array, first: int, last: int, indexed_size: int) -> List[dict]:
+        """Reads entries first..last (inclusive) with one contiguous read and parses them."""
+        start = offsets[first]
+        end = offsets[last + 1] if last + 1 < len(offsets) else indexed_size
+        log_file.seek(start)
+        block = log_file.read(end - start)
+        entries = []
+        for i in range(first, last + 1):
+            entry_end = (offsets[i + 1] if i + 1 <= last else end) - start
+            lines = block[offsets[i] - start:entry_end].decode('utf-8', errors='replace').rstrip('\n').split('\n')
+            entry = parse_entry_start(lines[0]) or {
+                "timestamp": "", "module": "", "level": "", "message": lines[0],
+            }
+            entry["details"] = "\n".join(part for part in [entry.get("details", "")] + lines[1:] if part)
+            entry["cursor"] = i
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _matches(entry: dict, min_level: Optional[str], module: Optional[str]) -> bool:
+        if min_level and entry["level"] in LEVELS and LEVELS.index(entry["level"]) < LEVELS.index(min_level):
+            return False
+        if module and not entry["module"].startswith(module):
+            return False
+        return True
+
+    def page(self, before: Optional[int] = None, limit: int = 50, level: Optional[str] = None,
+             module: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None) -> LogPage:
+        """
+        Returns up to `limit` entries older than the `before` cursor (newest first),
+        keeping entries at or above `level`, from modules starting with `module`, and
+        logged within [since, until] (epoch seconds).
+        """
+        self.refresh()
+        with self._lock:
+            # A consistent view: later refreshes only append to these (or replace them)
+            offsets, timestamps, indexed_size = self._offsets, self._timestamps, self._meta["indexed_size"]
+        total = len(offsets)
+        level = level.upper() if level and level.upper() in LEVELS else None
+        high = total if before is None else max(0, min(before, total))
+        if until is not None:
+            high = min(high, bisect.bisect_right(timestamps, until, 0, high))
+        low = bisect.bisect_left(timestamps, since, 0, high) if since is not None else 0
+
+        entries: List[dict] = []
+        scanned = 0
+        cursor = high
+        if cursor > low:
+            with open(self.log_path, 'rb') as log_file:
+                while cursor > low and len(entries) < limit and scanned < self.max_scan:
+                    # Read the next block of older entries, newest first
+                    first = max(low, cursor - max(limit, 1))
+                    for entry in reversed(self._read_entries(log_file, offsets, first, cursor - 1, indexed_size)):
+                        cursor = entry["cursor"]
+                        scanned += 1
+                        if self._matches(entry, level, module):
+                            entries.append(entry)
+                            if len(entries) == limit:
+                                break
+        return LogPage(entries, cursor if cursor > low else None, total)
@@ -0,0 +1,188 @@
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from app.services.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, STAGE_SECONDS
+
+# Set per HTTP request by RequestContextMiddleware; '-' outside a request
+request_id_var: ContextVar[str] = ContextVar('request_id', default='-')
+# Stage name -> seconds for the current request, filled in by timed_stage()
+_stage_durations: ContextVar[Optional[Dict[str, float]]] = ContextVar('stage_durations', default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def timed_stage(name: str):
+    """
+    Records the time spent in the block in the stage latency metrics and, inside an
+    HTTP request, adds it to that request's stage durations.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        durations = _stage_durations.get()
+        if durations is not None:
+            durations[name] = durations.get(name, 0.0) + elapsed
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps each record with the request id of the context that logged it."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON line. Tracebacks stay inside the line, and any
+    `extra={...}` fields (e.g. stage durations) are included as top-level keys.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "module": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, 'request_id', '-'),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without formatting them first, so each
+    file/stream handler applies its own formatter. Only the message arguments and
+    traceback are resolved here, while they still refer to live objects.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler(config) -> logging.Handler:
+    if config.LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            config.LOG_FILE, when=config.LOG_ROTATE_WHEN, backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+
+
+def setup_logging(config):
+    """
+    Routes every log record through an in-memory queue to a background listener
+    thread that writes to stdout and the (rotating) log file, so logging calls on
+    the event loop never wait on disk I/O. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    formatter = JsonFormatter() if config.LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout), _file_handler(config)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _LocalQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that gives each HTTP request an id (reusing a valid incoming
+    X-Request-ID), returns it in the response headers, and logs one summary line
+    per request with its status, total duration and stage durations. Request counts
+    and latencies are also recorded in the metrics.
+    Streaming responses are measured until their last body chunk is sent.
+    """
+    def __init__(self, app, logger_name: str = 'app.requests'):
+        self.app = app
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b'x-request-id', b'').decode('latin-1')
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex[:16]
+        id_token = request_id_var.set(request_id)
+        durations: Dict[str, float] = {}
+        stages_token = _stage_durations.set(durations)
+        start = time.perf_counter()
+        status = {"code": 500, "logged": False}
+
+        def log_request():
+            if status["logged"]:
+                return
+            status["logged"] = True
+            elapsed = time.perf_counter() - start
+            # The matched route template (e.g. /chat), not the raw path, keeps label values bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status["code"])
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route)
+            elapsed_ms = elapsed * 1000
+            stages_ms = {name: round(seconds * 1000, 1) for name, seconds in durations.items()}
+            stages = ", ".join(f"{name}={ms}ms" for name, ms in stages_ms.items())
+            self.logger.info(
+                f"{scope['method']} {scope['path']} -> {status['code']} in {elapsed_ms:.1f}ms"
+                + (f" ({stages})" if stages else ""),
+                extra={"status": status["code"], "duration_ms": round(elapsed_ms, 1), "stages_ms": stages_ms},
+            )
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b'x-request-id', request_id.encode('latin-1'))]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                log_request()
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            log_request()
+            raise
+        finally:
+            _stage_durations.reset(stages_token)
+            request_id_var.reset(id_token)
@@ -0,0 +1,237 @@
+import math
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.config import Config
+
+LabelValues = Tuple[str, ...]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Returns the exposition lines for every label set."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down. Either set explicitly, or read at scrape time
+    from `function`, which returns {label values tuple: value}.
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Dict[LabelValues, float]]] = None, type_name: str = "gauge"):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.function = function
+        # Lets a callback expose a counter kept elsewhere (e.g. cache hits) with the right type
+        self.type_name = type_name
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            values = self.function() or {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in sorted(values.items())
+        ]
+
+
+class Summary(_Metric):
+    """
+    Observed durations (or sizes) per label set, exported as p50/p95/p99 plus
+    _sum and _count. Quantiles are computed over a sliding window of the most
+    recent `window` observations, so they follow current behaviour.
+    """
+    type_name = "summary"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), window: int = 1024):
+        super().__init__(name, description, labelnames)
+        self.window = window
+        self._recent: Dict[LabelValues, Deque[float]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+        self._counts: Dict[LabelValues, int] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = deque(maxlen=self.window)
+            recent.append(value)
+            self._sums[key] = self._sums.get(key, 0.0) + value
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def clear(self):
+        """Forgets every observation (e.g. between benchmark phases)."""
+        with self._lock:
+            self._recent.clear()
+            self._sums.clear()
+            self._counts.clear()
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _quantile(ordered: List[float], q: float) -> float:
+        # Nearest-rank quantile
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        key = self._key(labels)
+        with self._lock:
+            ordered = sorted(self._recent.get(key, ()))
+        return {q: self._quantile(ordered, q) for q in QUANTILES} if ordered else {}
+
+    def snapshot(self) -> Dict[LabelValues, Dict[str, float]]:
+        """Returns {label values: {count, sum, p50, p95, p99}} for every label set observed so far."""
+        with self._lock:
+            observed = [(key, sorted(recent), self._sums[key], self._counts[key]) for key, recent in self._recent.items()]
+        return {
+            key: dict({"count": count, "sum": total},
+                      **{f"p{round(q * 100)}": self._quantile(ordered, q) for q in QUANTILES})
+            for key, ordered, total, count in observed
+        }
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [
+                (key, sorted(recent), self._sums[key], self._counts[key])
+                for key, recent in sorted(self._recent.items())
+            ]
+        lines = []
+        for key, ordered, total, count in snapshot:
+            for q in QUANTILES:
+                labels = _format_labels(self.labelnames, key, f'quantile="{q}"')
+                lines.append(f"{self.name}{labels} {_format_value(self._quantile(ordered, q))}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        return self.register(Gauge(name, description, labelnames, **kwargs))
+
+    def summary(self, name: str, description: str, labelnames: Sequence[str] = (), window: int = 1024) -> Summary:
+        return self.register(Summary(name, description, labelnames, window))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Process-wide metrics ---
+STAGE_SECONDS = REGISTRY.summary(
+    'app_stage_duration_seconds', "Time spent per processing stage (chat path and indexing).", ['stage'],
+    window=Config.METRICS_WINDOW)
+PIPELINE_STAGE_SECONDS = REGISTRY.summary(
+    'app_pipeline_stage_duration_seconds', "Wall time per data pipeline stage and run.", ['stage'], window=64)
+PIPELINE_STAGE_ITEMS = REGISTRY.counter(
+    'app_pipeline_stage_items_total', "Items processed per data pipeline stage.", ['stage'])
+HTTP_REQUESTS = REGISTRY.counter(
+    'app_http_requests_total', "HTTP requests by route and status.", ['method', 'route', 'status'])
+HTTP_REQUEST_SECONDS = REGISTRY.summary(
+    'app_http_request_duration_seconds', "HTTP request latency by route, until the last body chunk is sent.",
+    ['method', 'route'], window=Config.METRICS_WINDOW)
+SEARCH_BATCH_SIZE = REGISTRY.summary(
+    'app_search_batch_size', "Queries answered per batched vector search.", window=Config.METRICS_WINDOW)
+HTTP_CACHE_HIT_RATIO = REGISTRY.gauge(
+    'app_http_cache_hit_ratio', "HTTP cache hit ratio during the last data pipeline run.")
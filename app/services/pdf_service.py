@@ -1,59 +1,144 @@
+import os
+import math
 import requests
 import PyPDF2
-import io
 import logging
-from typing import Union
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from app.services.http_cache import HttpCache, download_to_file
 
 logger = logging.getLogger(__name__)
 
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, Optional[str]]]:
+    """
+    Extracts pages [start, end) from a PDF on disk. Runs in a worker process, which
+    opens the file itself so no PDF bytes are pickled between processes.
+    A page that fails to extract comes back with None as its text.
+    """
+    reader = PyPDF2.PdfReader(pdf_path)
+    pages = []
+    for page_index in range(start, end):
+        try:
+            text = reader.pages[page_index].extract_text() or ""
+        except Exception as e:
+            logger.warning(f"Failed to extract page {page_index + 1} of {pdf_path}: {e}")
+            text = None
+        pages.append((page_index + 1, text))
+    return pages
+
+
 class PDFService:
     """
     A service for downloading and extracting text from PDF files.
     """
-    def __init__(self, pdf_url: str):
+    def __init__(self, pdf_url: str, http_cache: Optional[HttpCache] = None,
+                 max_workers: int = 4, parallel_min_pages: int = 20):
         self.session = requests.Session()
         self.url = pdf_url
+        # Optional on-disk cache: an unchanged PDF skips both the download and the extraction
+        self.http_cache = http_cache
+        self.max_workers = max(max_workers, 1)
+        # Documents shorter than this are extracted in-process; a pool isn't worth starting
+        self.parallel_min_pages = parallel_min_pages
+        # False once a download or extraction failed part way
+        self.complete = True
 
-    def download_pdf(self) -> Union[bytes, None]:
+    def download_pdf(self) -> Union[str, None]:
         """
-        Downloads a PDF file from the instance's URL.
+        Streams the PDF at the instance's URL to a temporary file and returns its path.
+        The caller is responsible for removing the file.
         """
         if not self.url:
             logger.warning("No PDF URL provided.")
             return None
         try:
             logger.info(f"Downloading PDF from: {self.url}")
-            response = self.session.get(self.url, stream=True)
-            response.raise_for_status()
+            with self.session.get(self.url, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                pdf_path, _ = download_to_file(response)
             logger.info("PDF downloaded successfully.")
-            return response.content
+            return pdf_path
         except requests.exceptions.RequestException as e:
             logger.error(f"Error downloading PDF from {self.url}: {e}", exc_info=True)
             return None
 
-    def extract_text_from_bytes(self, pdf_bytes: bytes) -> Union[str, None]:
+    def iter_pages_from_file(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (page_no, text) for every page of a PDF on disk, in page order.
+        Large documents are split into page ranges extracted by a process pool.
+        Pages that fail to extract are skipped and reported by raising once the
+        others have been yielded, so a partial result is never cached.
+        """
+        num_pages = len(PyPDF2.PdfReader(pdf_path).pages)
+        logger.info(f"Extracting text from {num_pages} PDF pages.")
+
+        if num_pages < self.parallel_min_pages or self.max_workers == 1:
+            results = (_extract_page_range(pdf_path, page_index, page_index + 1) for page_index in range(num_pages))
+            yield from self._successful_pages(results, num_pages)
+            return
+
+        # Small ranges keep results flowing in order while the pool works ahead
+        pages_per_task = max(1, min(8, math.ceil(num_pages / self.max_workers)))
+        ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+        # 'spawn' avoids forking a process that holds model threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            results = pool.map(_extract_page_range, *zip(*[(pdf_path, s, e) for s, e in ranges]))
+            yield from self._successful_pages(results, num_pages)
+
+    @staticmethod
+    def _successful_pages(results: Iterable[List[Tuple[int, Optional[str]]]], num_pages: int) -> Iterator[Tuple[int, str]]:
+        failed = 0
+        for pages in results:
+            for page_no, text in pages:
+                if text is None:
+                    failed += 1
+                    continue
+                yield page_no, text
+        if failed:
+            raise RuntimeError(f"Could not extract text from {failed} of {num_pages} PDF pages.")
+
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
         """
-        Extracts all text from the binary content of a PDF file.
+        Downloads the PDF and yields (page_no, text) as pages are extracted, so
+        downstream chunking can start before the whole document is processed.
+        `complete` is False afterwards if any page may be missing.
         """
+        self.complete = True
+        if not self.url:
+            logger.warning("No PDF URL provided.")
+            return
         try:
-            logger.info("Extracting text from PDF bytes.")
-            pdf_file = io.BytesIO(pdf_bytes)
-            reader = PyPDF2.PdfReader(pdf_file)
-            all_text = "".join(page.extract_text() for page in reader.pages)
-            logger.info("Text extracted successfully.")
-            return all_text
+            if self.http_cache is not None:
+                logger.info(f"Fetching PDF (cached) from: {self.url}")
+                for page_no, text in self.http_cache.iter_file(
+                        self.session, self.url, self.iter_pages_from_file, timeout=60):
+                    yield page_no, text
+                return
+
+            pdf_path = self.download_pdf()
+            if pdf_path is None:
+                self.complete = False
+                return
+            try:
+                yield from self.iter_pages_from_file(pdf_path)
+            finally:
+                os.remove(pdf_path)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error downloading PDF from {self.url}: {e}", exc_info=True)
+            self.complete = False
         except PyPDF2.errors.PdfReadError:
             logger.error("Error: The file is not a valid PDF or is corrupted.")
-            return None
+            self.complete = False
         except Exception as e:
             logger.error(f"An unexpected error occurred during text extraction: {e}", exc_info=True)
-            return None
+            self.complete = False
 
     def process_pdf(self) -> Union[str, None]:
         """
         Downloads a PDF and extracts all text from it.
         """
-        pdf_content = self.download_pdf()
-        if pdf_content:
-            return self.extract_text_from_bytes(pdf_content)
-        return None
\ No newline at end of file
+        text = "".join(page_text for _, page_text in self.iter_pages())
+        return text or None
@@ -0,0 +1,90 @@
+import time
+import sqlite3
+import logging
+from typing import Optional
+from limits.storage import Storage
+from app.services.session_store import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+class SQLiteRateLimitStorage(Storage):
+    """
+    A `limits` storage backend kept in a SQLite file, so every worker process
+    pointing at the same file shares one set of rate-limit counters.
+    Registered for URIs of the form ``sqlite:///absolute/path/to/file.db``.
+    Importing this module is enough to make the scheme available to slowapi.
+    """
+    STORAGE_SCHEME = ["sqlite"]
+    # Expired counters are purged every this many increments
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.db_path = uri[len("sqlite://"):]
+        self._conn = connect_sqlite(self.db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY,"
+            " count INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._increments = 0
+        logger.info(f"Using SQLite rate-limit storage at: {self.db_path}")
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        with self.lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT count, expires_at FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    count, expires_at = amount, now + expiry
+                else:
+                    count = row[0] + amount
+                    expires_at = now + expiry if elastic_expiry else row[1]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)",
+                    (key, count, expires_at),
+                )
+                self._increments += 1
+                if self._increments % self.PURGE_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self.lock:
+            row = self._conn.execute("SELECT expires_at FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self.lock:
+                self._conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self.lock:
+            return self._conn.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self._conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
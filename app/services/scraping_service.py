@@ -1,21 +1,94 @@
+import time
 import requests
+import threading
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
 import logging
-from typing import Set, List
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from app.services.http_cache import HttpCache
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of a URL so that fragment, trailing-slash, default-port
+    and query-order variants of the same page are treated as one page.
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parsed.port}"
+    path = parsed.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, path, '', query, ''))
+
+
+class HostThrottle:
+    """
+    Limits concurrent requests per host and enforces a minimum delay between the
+    start of consecutive requests to the same host.
+    """
+    def __init__(self, max_concurrency: int = 2, delay: float = 0.25):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+
+    def set_delay(self, host: str, delay: float):
+        """Overrides the delay for one host (e.g. from a robots.txt Crawl-delay)."""
+        with self._lock:
+            self._delays[host] = max(delay, self.delay)
+
+    def acquire(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.max_concurrency))
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self._delays.get(host, self.delay)
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host: str):
+        self._semaphores[host].release()
+
+
 class ScrapingService:
     """
-    A service to scrape a website, extract text, and find internal links.
+    A service to crawl a website concurrently, extract text, and find internal links.
     """
-    def __init__(self, root_url: str):
+    def __init__(self, root_url: str, max_pages: int = 200, max_depth: int = 5, max_workers: int = 4,
+                 per_host_concurrency: int = 2, delay: float = 0.25, respect_robots: bool = True,
+                 http_cache: Optional[HttpCache] = None):
         if not root_url:
             raise ValueError("A root URL must be provided.")
         self.root_url = root_url
-        self.domain = urlparse(root_url).netloc
+        # Compared against normalised links, so it is normalised the same way
+        self.domain = urlparse(normalize_url(root_url)).netloc
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_workers = max(max_workers, 1)
+        self.respect_robots = respect_robots
+        # Optional on-disk cache: unchanged pages skip both the download and the parse
+        self.http_cache = http_cache
+        self.throttle = HostThrottle(per_host_concurrency, delay)
+        self._robots: Dict[str, RobotFileParser] = {}
+        self._robots_lock = threading.Lock()
         self.session = requests.Session()
+        # False once a crawl skipped a page because of an error or hit max_pages
+        self.complete = True
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
@@ -24,84 +97,159 @@ class ScrapingService:
         """
         Checks if a URL is valid, on the same domain, and not an anchor/media link.
         """
-        parsed_url = urlparse(url)
+        parsed_url = urlparse(normalize_url(url))
         # Ensure it's a web link and on the same domain
         if parsed_url.scheme not in ['http', 'https'] or parsed_url.netloc != self.domain:
             return False
         # Ignore links to files or special protocols
-        if parsed_url.path.split('.')[-1] in ['pdf', 'jpg', 'png', 'zip', 'mailto:', 'tel:']:
+        if parsed_url.path.split('.')[-1].lower() in ['pdf', 'jpg', 'jpeg', 'png', 'gif', 'svg', 'zip', 'mailto:', 'tel:']:
             return False
         return True
 
-    def scrape_page(self, url: str) -> (str, List[str]):
+    def _can_fetch(self, url: str) -> bool:
+        """Checks the host's robots.txt (fetched once per host). Unreachable robots.txt allows everything."""
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        host = parsed.netloc
+        with self._robots_lock:
+            parser = self._robots.get(host)
+            if parser is None:
+                parser = RobotFileParser()
+                try:
+                    response = self.session.get(f"{parsed.scheme}://{host}/robots.txt", timeout=10)
+                    if response.status_code == 200:
+                        parser.parse(response.text.splitlines())
+                    else:
+                        parser.allow_all = True
+                except requests.RequestException:
+                    parser.allow_all = True
+                crawl_delay = parser.crawl_delay(self.session.headers['User-Agent'])
+                if crawl_delay:
+                    self.throttle.set_delay(host, float(crawl_delay))
+                self._robots[host] = parser
+        return parser.can_fetch(self.session.headers['User-Agent'], url)
+
+    def _parse_page(self, url: str, response: requests.Response) -> dict:
+        """Extracts the cleaned text and valid internal links from an HTML response."""
+        # Ensure we are handling HTML content
+        if 'text/html' not in response.headers.get('Content-Type', ''):
+            logger.warning(f"Skipping non-HTML content at {url}")
+            return {"text": "", "links": []}
+
+        soup = BeautifulSoup(response.text, 'lxml')
+
+        # Remove script and style elements
+        for script_or_style in soup(['script', 'style']):
+            script_or_style.decompose()
+
+        # Get text and clean it up
+        text = soup.get_text()
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        page_text = '\n'.join(chunk for chunk in chunks if chunk)
+
+        # Find all links and resolve them relative to the page they appear on
+        links = []
+        for a_tag in soup.find_all('a', href=True):
+            full_url = urljoin(url, a_tag['href'])
+            if self._is_valid_url(full_url):
+                links.append(full_url)
+
+        return {"text": page_text, "links": links}
+
+    def scrape_page(self, url: str) -> Tuple[str, List[str]]:
         """
         Scrapes a single page for its text content and all valid internal links.
         Returns a tuple of (page_text, found_links).
         """
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            # Ensure we are handling HTML content
-            if 'text/html' not in response.headers.get('Content-Type', ''):
-                logger.warning(f"Skipping non-HTML content at {url}")
-                return "", []
-
-            soup = BeautifulSoup(response.text, 'lxml')
-
-            # Remove script and style elements
-            for script_or_style in soup(['script', 'style']):
-                script_or_style.decompose()
-
-            # Get text and clean it up
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            page_text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            # Find all links and resolve them
-            links = []
-            for a_tag in soup.find_all('a', href=True):
-                href = a_tag['href']
-                full_url = urljoin(self.root_url, href)
-                if self._is_valid_url(full_url):
-                    links.append(full_url)
-            
-            return page_text, links
+            if self.http_cache is not None:
+                page = self.http_cache.fetch(
+                    self.session, url, lambda response: self._parse_page(url, response), timeout=10
+                )
+            else:
+                response = self.session.get(url, timeout=10)
+                response.raise_for_status()
+                page = self._parse_page(url, response)
+            return page["text"], page["links"]
 
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (404, 410):
+                # The page is gone; its indexed chunks should go too
+                logger.warning(f"Page not found: {url}")
+            else:
+                logger.error(f"Failed to scrape {url}: {e}")
+                self.complete = False
+            return "", []
         except requests.RequestException as e:
             logger.error(f"Failed to scrape {url}: {e}")
+            self.complete = False
             return "", []
 
-    def crawl_website(self) -> str:
+    def _scrape_politely(self, url: str) -> Tuple[str, List[str]]:
+        """Scrapes a page within the per-host concurrency and delay limits."""
+        host = urlparse(url).netloc
+        self.throttle.acquire(host)
+        try:
+            logger.info(f"Scraping: {url}")
+            return self.scrape_page(url)
+        finally:
+            self.throttle.release(host)
+
+    def iter_pages(self) -> Iterator[dict]:
         """
-        Recursively crawls the entire website starting from the root URL.
-        Returns all extracted text from all pages combined.
+        Crawls the website breadth-first from the root URL with a pool of workers,
+        yielding one {'url': ..., 'text': ...} entry per page with text as soon as it is scraped.
+        `complete` is False afterwards if a page failed or the page limit cut the crawl short.
         """
+        self.complete = True
         if not self.root_url:
             logger.info("No website URL provided. Skipping web scraping.")
-            return ""
+            return
 
-        urls_to_visit = [self.root_url]
-        visited_urls: Set[str] = set()
-        all_website_text = ""
+        root = normalize_url(self.root_url)
+        frontier = deque([(root, 0)])
+        seen: Set[str] = {root}
+        submitted = 0
+        pages_with_text = 0
 
         logger.info(f"Starting crawl of {self.root_url}")
 
-        while urls_to_visit:
-            url = urls_to_visit.pop(0)
-            if url in visited_urls:
-                continue
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler") as pool:
+            in_flight = {}
+            while frontier or in_flight:
+                while frontier and len(in_flight) < self.max_workers and submitted < self.max_pages:
+                    url, depth = frontier.popleft()
+                    if not self._can_fetch(url):
+                        logger.info(f"Skipping {url} (disallowed by robots.txt)")
+                        continue
+                    in_flight[pool.submit(self._scrape_politely, url)] = (url, depth)
+                    submitted += 1
+                if not in_flight:
+                    break
 
-            logger.info(f"Scraping: {url}")
-            visited_urls.add(url)
-
-            text, new_links = self.scrape_page(url)
-            if text:
-                all_website_text += f"\n\n--- Content from {url} ---\n{text}"
-            
-            for link in new_links:
-                if link not in visited_urls:
-                    urls_to_visit.append(link)
-        
-        logger.info(f"Finished crawling. Visited {len(visited_urls)} pages.")
-        return all_website_text
\ No newline at end of file
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    text, new_links = future.result()
+                    if depth < self.max_depth:
+                        for link in new_links:
+                            link = normalize_url(link)
+                            if link not in seen:
+                                seen.add(link)
+                                frontier.append((link, depth + 1))
+                    if text:
+                        pages_with_text += 1
+                        yield {"url": url, "text": text}
+
+        if frontier:
+            logger.warning(f"Crawl stopped at max_pages={self.max_pages} with {len(frontier)} pages left unvisited.")
+            self.complete = False
+        logger.info(f"Finished crawling. Visited {submitted} pages, {pages_with_text} with text.")
+
+    def crawl_website(self) -> List[dict]:
+        """
+        Crawls the whole website and returns one {'url': ..., 'text': ...} entry per page that had text.
+        """
+        return list(self.iter_pages())
@@ -0,0 +1,65 @@
+import logging
+from typing import Dict
+from app.services.session_store import History, SessionStore
+
+logger = logging.getLogger(__name__)
+
+class SessionManager:
+    """
+    Keeps per-client chat history in a pluggable SessionStore and bounds how much
+    of it is resent to the model on every turn.
+    """
+    def __init__(self, store: SessionStore, max_turns: int = 10, max_history_tokens: int = 8000):
+        self.store = store
+        self.max_turns = max_turns
+        self.max_history_tokens = max_history_tokens
+        self.created_count = 0
+        self.truncated_count = 0
+
+    def load(self, session_id: str) -> History:
+        """Returns the stored history for a session (without the system prompt)."""
+        history = self.store.load(session_id)
+        if history is None:
+            logger.info(f"Creating new chat session for session_id: {session_id}")
+            self.created_count += 1
+            return []
+        return history
+
+    def append_turn(self, session_id: str, history: History, user_query: str, response_text: str):
+        """Records a completed user/model exchange and persists the truncated history."""
+        history = history + [
+            {'role': 'user', 'parts': [user_query]},
+            {'role': 'model', 'parts': [response_text]},
+        ]
+        self.store.save(session_id, self.trim_history(history))
+
+    @staticmethod
+    def _estimate_tokens(message: dict) -> int:
+        """Rough token estimate (~4 characters per token) for a history message."""
+        return sum(len(part) for part in message['parts']) // 4
+
+    def trim_history(self, history: History) -> History:
+        """
+        Keeps the most recent turns that fit within the configured turn and token budgets.
+        """
+        turns = history
+        if self.max_turns and len(turns) > self.max_turns * 2:
+            turns = turns[-self.max_turns * 2:]
+
+        token_counts = [self._estimate_tokens(m) for m in turns]
+        total = sum(token_counts)
+        # Drop whole user/model pairs from the front so roles keep alternating
+        while len(turns) > 2 and total > self.max_history_tokens:
+            total -= token_counts[0] + token_counts[1]
+            turns, token_counts = turns[2:], token_counts[2:]
+
+        if len(turns) < len(history):
+            self.truncated_count += 1
+            logger.debug(f"Truncated chat history from {len(history)} to {len(turns)} messages.")
+        return turns
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counters describing the session store and history truncation."""
+        stats = self.store.stats()
+        stats.update({"created": self.created_count, "truncated": self.truncated_count})
+        return stats
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A serialised chat history: [{'role': 'user' | 'model', 'parts': [str, ...]}, ...]
+History = List[dict]
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite connection that can be shared between threads and safely used
+    by several worker processes at once (WAL journal, generous busy timeout).
+    """
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SessionStore(ABC):
+    """
+    Base class for chat history backends. Histories are stored as plain,
+    JSON-serialisable lists so they can be shared between processes.
+    """
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[History]:
+        """Returns the stored history for a session, or None if it is unknown or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, history: History):
+        """Stores the history for a session, evicting old sessions if needed."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Removes a session."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Returns counters describing the current state of the store."""
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Per-process session store. Sessions are evicted least-recently-used first
+    once `max_sessions` is reached, and dropped after `ttl_seconds` without activity.
+    """
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: int = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Tuple[History, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_lru_count = 0
+        self.evicted_idle_count = 0
+
+    def _evict_expired(self, now: float):
+        """Drops sessions idle for longer than the TTL. Oldest entries sit at the front."""
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_idle_count += 1
+            logger.info(f"Evicted idle chat session: {session_id}")
+
+    def load(self, session_id: str) -> Optional[History]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            if session_id not in self._sessions:
+                return None
+            history, _ = self._sessions.pop(session_id)
+            self._sessions[session_id] = (history, now)
+            return list(history)
+
+    def save(self, session_id: str, history: History):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            self._sessions.pop(session_id, None)
+            while len(self._sessions) >= self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                self.evicted_lru_count += 1
+                logger.info(f"Evicted least recently used chat session: {evicted_id}")
+            self._sessions[session_id] = (list(history), now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return {
+                "live_sessions": len(self._sessions),
+                "evicted_lru": self.evicted_lru_count,
+                "evicted_idle": self.evicted_idle_count,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a SQLite file, shared by every worker process that
+    points at the same path. Applies the same LRU cap and idle TTL as the
+    in-memory store. Eviction counters are tracked per process.
+    """
+    def __init__(self, db_path: str, max_sessions: int = 1000, ttl_seconds: int = 1800):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " history TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_used ON chat_sessions (last_used)")
+        self.evicted_lru_count = 0
+        self.evicted_idle_count = 0
+        logger.info(f"Using SQLite session store at: {db_path}")
+
+    def load(self, session_id: str) -> Optional[History]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history FROM chat_sessions WHERE session_id = ? AND last_used > ?",
+                (session_id, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE chat_sessions SET last_used = ? WHERE session_id = ?", (now, session_id))
+        return json.loads(row[0])
+
+    def save(self, session_id: str, history: History):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO chat_sessions (session_id, history, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET history = excluded.history, last_used = excluded.last_used",
+                    (session_id, json.dumps(history), now),
+                )
+                expired = self._conn.execute(
+                    "DELETE FROM chat_sessions WHERE last_used <= ?", (now - self.ttl_seconds,)
+                ).rowcount
+                overflow = self._conn.execute(
+                    "DELETE FROM chat_sessions WHERE session_id IN ("
+                    " SELECT session_id FROM chat_sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_sessions,),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.evicted_idle_count += max(expired, 0)
+            self.evicted_lru_count += max(overflow, 0)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            live = self._conn.execute(
+                "SELECT COUNT(*) FROM chat_sessions WHERE last_used > ?", (time.time() - self.ttl_seconds,)
+            ).fetchone()[0]
+        return {
+            "live_sessions": live,
+            "evicted_lru": self.evicted_lru_count,
+            "evicted_idle": self.evicted_idle_count,
+        }
+
+
+def create_session_store(config) -> SessionStore:
+    """Builds the session store selected by `Config.SESSION_BACKEND`."""
+    backend = (config.SESSION_BACKEND or 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionStore(config.SESSION_DB_PATH, config.SESSION_MAX_COUNT, config.SESSION_TTL_SECONDS)
+    if backend != 'memory':
+        raise ValueError(f"Unknown session backend: {config.SESSION_BACKEND}")
+    return InMemorySessionStore(config.SESSION_MAX_COUNT, config.SESSION_TTL_SECONDS)
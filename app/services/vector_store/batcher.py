@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A search request: (query, k)
+SearchRequest = Tuple[str, int]
+
+class QueryBatcher:
+    """
+    Collects search requests that arrive within a short window and hands them to
+    `process_batch` as a single call in the executor, so concurrent queries share
+    one encode and one index search. Each caller gets back its own results.
+    """
+    def __init__(
+        self,
+        process_batch: Callable[[List[SearchRequest]], List[List[str]]],
+        executor: Executor,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+    ):
+        self.process_batch = process_batch
+        self.executor = executor
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(max_batch_size, 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The loop only keeps weak references to tasks, so in-flight dispatches are held here
+        self._inflight: Set[asyncio.Task] = set()
+        self.batches_processed = 0
+        self.requests_processed = 0
+
+    def _ensure_worker(self):
+        """Starts the collector task on the running event loop (once per loop)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+
+    async def submit(self, query: str, k: int) -> List[str]:
+        """Queues a search and waits for its slice of the batched result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((query, k, future))
+        return await future
+
+    async def _collect(self):
+        """Groups queued requests into batches bounded by time window and size."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting on the clock
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Don't await the batch here, so the next window starts collecting right away
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._inflight.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Search batch dispatch failed: {task.exception()}", exc_info=task.exception())
+
+    async def shutdown(self):
+        """Stops collecting new batches and waits for the in-flight ones to resolve their callers."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        # Callers still queued behind the stopped collector would otherwise wait forever
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def _dispatch(self, batch: list):
+        """Runs one batch in the executor and resolves each caller's future."""
+        requests = [(query, k) for query, k, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.process_batch, requests
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_processed += 1
+        self.requests_processed += len(batch)
+        logger.debug(f"Processed a batch of {len(batch)} search requests.")
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
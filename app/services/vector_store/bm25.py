@@ -0,0 +1,131 @@
+import re
+import math
+import heapq
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:[+#]+|[._-][a-z0-9]+)*')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cases and splits text into terms. Dotted, dashed and snake_case names
+    (e.g. 'fast-api', 'node.js', 'my_repo') are kept whole and also indexed by their parts,
+    so both exact repo names and their words match.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r'[._-]', token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+
+class BM25Index:
+    """
+    An in-memory inverted index scoring chunks with Okapi BM25, kept next to the
+    FAISS index so exact names and keywords can be matched lexically.
+    Chunks can be added and removed by id; copy() gives an independent index for
+    building the next snapshot while the current one keeps serving searches. Copies
+    share posting lists until one of them changes a term, so an update only pays
+    for the terms it touches.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {chunk id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        # Terms whose posting list this index may change in place (not shared with a copy)
+        self._owned: Set[str] = set()
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[int, str]], **params) -> 'BM25Index':
+        index = cls(**params)
+        for chunk_id, text in chunks:
+            index.add(chunk_id, text)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, chunk_id: int, text: str):
+        if chunk_id in self.doc_lengths:
+            raise ValueError(f"Chunk {chunk_id} is already indexed.")
+        terms = tokenize(text)
+        self.doc_lengths[chunk_id] = len(terms)
+        self.total_length += len(terms)
+        for term in terms:
+            posting = self._writable_posting(term)
+            posting[chunk_id] = posting.get(chunk_id, 0) + 1
+
+    def remove(self, chunk_id: int, text: str):
+        """Removes a chunk; `text` must be the text it was added with."""
+        if chunk_id not in self.doc_lengths:
+            return
+        self.total_length -= self.doc_lengths.pop(chunk_id)
+        for term in set(tokenize(text)):
+            if term not in self.postings:
+                continue
+            posting = self._writable_posting(term)
+            posting.pop(chunk_id, None)
+            if not posting:
+                del self.postings[term]
+                self._owned.discard(term)
+
+    def _writable_posting(self, term: str) -> Dict[int, int]:
+        """Returns the posting list for `term`, copying it first if it is shared with a copy."""
+        posting = self.postings.get(term)
+        if posting is None or term not in self._owned:
+            posting = self.postings[term] = dict(posting or {})
+            self._owned.add(term)
+        return posting
+
+    def copy(self) -> 'BM25Index':
+        clone = BM25Index(self.k1, self.b)
+        clone.postings = dict(self.postings)
+        clone.doc_lengths = dict(self.doc_lengths)
+        clone.total_length = self.total_length
+        # Every posting list is shared now, so neither side may change one in place
+        self._owned = set()
+        return clone
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (chunk id, BM25 score) pairs, best first."""
+        if not self.doc_lengths:
+            return []
+        num_docs = len(self.doc_lengths)
+        avg_length = self.total_length / num_docs or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (num_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> dict:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_lengths": {str(i): n for i, n in self.doc_lengths.items()},
+            "postings": {term: {str(i): tf for i, tf in posting.items()} for term, posting in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BM25Index':
+        index = cls(data["k1"], data["b"])
+        index.doc_lengths = {int(i): n for i, n in data["doc_lengths"].items()}
+        index.total_length = sum(index.doc_lengths.values())
+        index.postings = {
+            term: {int(i): tf for i, tf in posting.items()} for term, posting in data["postings"].items()
+        }
+        index._owned = set(index.postings)
+        return index
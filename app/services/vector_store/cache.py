@@ -0,0 +1,55 @@
+import threading
+from typing import Any, Dict, Hashable
+from cachetools import LRUCache as _LRUCache
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded LRU cache that counts hits and misses.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = _LRUCache(maxsize=max(maxsize, 1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` on a miss."""
+        if self.maxsize <= 0:
+            self.misses += 1
+            return default
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Stores a value, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        """Drops every entry. Hit/miss counters are kept."""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the size and hit/miss counters of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,210 @@
+import os
+import mmap
+import json
+import struct
+import logging
+import numpy as np
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Layout: magic | count (uint64) | ids int64[count] (sorted) | text offsets uint64[count + 1]
+#         | metadata offsets uint64[count + 1] | text blob | metadata blob (JSON per chunk)
+_MAGIC = b'CHUNKS01'
+_HEADER = struct.Struct('<8sQ')
+
+
+def write_chunk_store(path: str, texts: Mapping, metadata: Callable[[int], dict]):
+    """
+    Writes the {chunk id: text} mapping `texts`, plus `metadata(chunk_id)` for each
+    chunk, to `path` in the offsets+blob format. Texts are looked up one at a time,
+    so a memory-mapped or overlay mapping is streamed rather than copied.
+    The file is written under a temp name and renamed over.
+    """
+    ids = np.array(sorted(texts), dtype='<i8')
+    text_offsets = np.zeros(len(ids) + 1, dtype='<u8')
+    meta_offsets = np.zeros(len(ids) + 1, dtype='<u8')
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        # Reserve space for the header and tables, write the blobs, then fill the tables in
+        f.write(b'\0' * (_HEADER.size + ids.nbytes + text_offsets.nbytes + meta_offsets.nbytes))
+        position = 0
+        for row, chunk_id in enumerate(ids):
+            data = texts[int(chunk_id)].encode('utf-8')
+            f.write(data)
+            position += len(data)
+            text_offsets[row + 1] = position
+        meta_offsets[0] = position
+        for row, chunk_id in enumerate(ids):
+            data = json.dumps(metadata(int(chunk_id)) or {}, separators=(',', ':')).encode('utf-8')
+            f.write(data)
+            position += len(data)
+            meta_offsets[row + 1] = position
+
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, len(ids)))
+        f.write(ids.tobytes())
+        f.write(text_offsets.tobytes())
+        f.write(meta_offsets.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_vectors(path: str, ids: np.ndarray, vectors_for: Callable[[np.ndarray], Optional[np.ndarray]],
+                  block_size: int = 4096) -> bool:
+    """
+    Writes the float embeddings of `ids` (sorted, as in the chunk store) to a .npy file,
+    row-aligned with the chunk store, in blocks so they are never all in memory at once.
+    Returns False (and writes nothing) if some vectors are unavailable.
+    """
+    if len(ids) == 0:
+        return False
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    out = None
+    try:
+        for start in range(0, len(ids), block_size):
+            block = vectors_for(ids[start:start + block_size])
+            if block is None:
+                return False
+            if out is None:
+                out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype='float32', shape=(len(ids), block.shape[1]))
+            out[start:start + len(block)] = block
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ChunkStore(Mapping):
+    """
+    A read-only, memory-mapped {chunk id: text} mapping over a file written by
+    write_chunk_store(). Only the id and offset tables are touched at open time;
+    a chunk's text is decoded when it is looked up, so a search decodes just its hits.
+    The float embeddings, when stored, are memory-mapped from `vectors_path` the same way.
+    """
+    def __init__(self, path: str, vectors_path: Optional[str] = None):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Zero-length files can't be mapped
+            self._file.close()
+            raise ValueError(f"Chunk store {path} is empty or truncated.")
+        magic, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a chunk store.")
+        offset = _HEADER.size
+        self._ids = np.frombuffer(self._mmap, dtype='<i8', count=count, offset=offset)
+        offset += self._ids.nbytes
+        self._text_offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=offset)
+        offset += self._text_offsets.nbytes
+        self._meta_offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=offset)
+        self._blob_start = offset + self._meta_offsets.nbytes
+        self._vectors = None
+        if vectors_path and os.path.exists(vectors_path):
+            self._vectors = np.load(vectors_path, mmap_mode='r')
+
+    def _row(self, chunk_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self._ids, chunk_id))
+        if row < len(self._ids) and self._ids[row] == chunk_id:
+            return row
+        return None
+
+    def _slice(self, offsets: np.ndarray, row: int) -> bytes:
+        start = self._blob_start + int(offsets[row])
+        end = self._blob_start + int(offsets[row + 1])
+        return self._mmap[start:end]
+
+    def __getitem__(self, chunk_id: int) -> str:
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        return self._slice(self._text_offsets, row).decode('utf-8')
+
+    def __contains__(self, chunk_id) -> bool:
+        return isinstance(chunk_id, (int, np.integer)) and self._row(chunk_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return (int(i) for i in self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def metadata(self, chunk_id: int) -> dict:
+        """Returns the metadata stored with a chunk (repo, URL, page, ...)."""
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        return json.loads(self._slice(self._meta_offsets, row))
+
+    def vectors_for(self, chunk_ids) -> Optional[np.ndarray]:
+        """Returns the float embeddings of `chunk_ids` (one row each), or None if any is unavailable."""
+        if self._vectors is None:
+            return None
+        chunk_ids = np.asarray(chunk_ids, dtype='int64')
+        rows = np.searchsorted(self._ids, chunk_ids)
+        if np.any(rows >= len(self._ids)) or np.any(self._ids[np.minimum(rows, len(self._ids) - 1)] != chunk_ids):
+            return None
+        return np.asarray(self._vectors[rows], dtype='float32')
+
+    def close(self):
+        # Views over the map must be released before it can be closed
+        self._ids = self._text_offsets = self._meta_offsets = self._vectors = None
+        self._mmap.close()
+        self._file.close()
+
+
+class ChunkOverlay(Mapping):
+    """
+    A {chunk id: text} view of `base` with some ids removed and others added, used to
+    describe the next snapshot's texts (and embeddings) without copying the current
+    ones into memory.
+    """
+    def __init__(self, base: Mapping, removed: Set[int] = None, added: Dict[int, str] = None,
+                 added_vectors: Dict[int, np.ndarray] = None):
+        self.base = base
+        self.removed = set(removed or ())
+        self.added = dict(added or {})
+        self.added_vectors = dict(added_vectors or {})
+
+    def __getitem__(self, chunk_id: int) -> str:
+        if chunk_id in self.added:
+            return self.added[chunk_id]
+        if chunk_id in self.removed:
+            raise KeyError(chunk_id)
+        return self.base[chunk_id]
+
+    def __iter__(self) -> Iterator[int]:
+        for chunk_id in self.base:
+            if chunk_id not in self.removed and chunk_id not in self.added:
+                yield chunk_id
+        yield from self.added
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def vectors_for(self, chunk_ids) -> Optional[np.ndarray]:
+        """Returns the float embeddings of `chunk_ids`, or None if any is unavailable."""
+        chunk_ids = [int(i) for i in chunk_ids]
+        base_ids = [i for i in chunk_ids if i not in self.added]
+        base_rows = None
+        if base_ids:
+            base_vectors = getattr(self.base, 'vectors_for', None)
+            base_rows = base_vectors(base_ids) if base_vectors else None
+            if base_rows is None:
+                return None
+            base_rows = dict(zip(base_ids, base_rows))
+        rows = []
+        for chunk_id in chunk_ids:
+            row = self.added_vectors.get(chunk_id) if chunk_id in self.added else base_rows[chunk_id]
+            if row is None:
+                return None
+            rows.append(row)
+        return np.vstack(rows).astype('float32', copy=False)
@@ -0,0 +1,46 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_BACKEND = 'torch'
+
+_models: Dict[Tuple[str, str, Optional[str]], SentenceTransformer] = {}
+_lock = threading.Lock()
+
+
+def encoder_id(model_name: str = DEFAULT_MODEL_NAME, backend: str = DEFAULT_BACKEND,
+               model_file: Optional[str] = None) -> str:
+    """
+    Identifies an encoder configuration. Vectors from different encoders aren't
+    comparable, so the index records which one built it.
+    """
+    return ":".join(part for part in (model_name, backend or DEFAULT_BACKEND, model_file) if part)
+
+
+def get_embedding_model(model_name: str = DEFAULT_MODEL_NAME, backend: str = DEFAULT_BACKEND,
+                        model_file: Optional[str] = None) -> SentenceTransformer:
+    """
+    Returns the process-wide SentenceTransformer for `model_name`, loading it on
+    first use. Every VectorStoreService in the process shares this instance.
+
+    `backend` may be 'torch', 'onnx' or 'openvino'; the latter two need the
+    optimum/onnxruntime (or openvino) extras installed. `model_file` selects a
+    specific exported file, e.g. 'onnx/model_qint8_avx512_vnni.onnx' for the
+    int8-quantized ONNX model.
+    """
+    backend = backend or DEFAULT_BACKEND
+    key = (model_name, backend, model_file)
+    with _lock:
+        if key not in _models:
+            logger.info(f"Initializing SentenceTransformer with model: {encoder_id(*key)}")
+            kwargs = {}
+            if backend != DEFAULT_BACKEND:
+                kwargs['backend'] = backend
+                if model_file:
+                    kwargs['model_kwargs'] = {'file_name': model_file}
+            _models[key] = SentenceTransformer(model_name, **kwargs)
+        return _models[key]
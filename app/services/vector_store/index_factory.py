@@ -0,0 +1,107 @@
+import math
+import faiss
+import logging
+import numpy as np
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq', 'sq8', 'binary')
+
+# Index types whose stored codes lose precision; their candidates are re-ranked with float vectors
+QUANTIZED_INDEX_TYPES = ('ivf_pq', 'sq8', 'binary')
+
+# FAISS warns when there are fewer training points than this per IVF list
+_MIN_POINTS_PER_LIST = 39
+
+
+def resolve_index_type(num_vectors: int, index_type: str = None, dimension: int = None) -> str:
+    """
+    Picks the index type to build. 'auto' keeps exact search for small corpora and
+    switches to HNSW once the chunk count reaches VECTOR_INDEX_AUTO_THRESHOLD.
+    'ivf_pq' falls back to 'ivf_flat' when the corpus (or `dimension`) can't train it.
+    """
+    index_type = (index_type or Config.VECTOR_INDEX_TYPE).lower()
+    if index_type == 'auto':
+        return 'hnsw' if num_vectors >= Config.VECTOR_INDEX_AUTO_THRESHOLD else 'flat'
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    if index_type == 'ivf_pq' and (num_vectors < 256 or (dimension is not None and dimension % Config.PQ_M != 0)):
+        # 8-bit PQ codebooks need at least 256 training points and M must divide the dimension
+        return 'ivf_flat'
+    return index_type
+
+
+def _ivf_nlist(num_vectors: int) -> int:
+    """Number of IVF lists: configured value, or ~4*sqrt(n), capped so every list can be trained."""
+    nlist = Config.IVF_NLIST or int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // _MIN_POINTS_PER_LIST))
+
+
+def build_index(embeddings: np.ndarray, index_type: str = None, ids: np.ndarray = None) -> faiss.Index:
+    """
+    Builds (and trains, where needed) an inner-product index over normalised embeddings.
+    When `ids` are given the index is wrapped in an IndexIDMap2 so entries can be
+    addressed (and removed) by chunk id.
+    """
+    num_vectors, dimension = embeddings.shape
+    requested = (index_type or Config.VECTOR_INDEX_TYPE).lower()
+    index_type = resolve_index_type(num_vectors, index_type, dimension)
+    if requested == 'ivf_pq' and index_type != 'ivf_pq':
+        logger.warning("Not enough vectors (or incompatible PQ_M) for IVF-PQ, falling back to IVF-Flat.")
+
+    logger.info(f"Building '{index_type}' index for {num_vectors} vectors of dimension {dimension}.")
+    if index_type == 'flat':
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == 'sq8':
+        # One byte per dimension instead of four
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type == 'binary':
+        # One sign bit per dimension, compared by Hamming distance
+        index = faiss.IndexLSH(dimension, dimension, False, False)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, Config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+    else:
+        nlist = _ivf_nlist(num_vectors)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, Config.PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+        logger.info(f"Training IVF index with {nlist} lists...")
+        index.train(embeddings)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    else:
+        index.add(embeddings)
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index: faiss.Index):
+    """Applies the configured efSearch / nprobe to an HNSW or IVF index (no-op for flat)."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = Config.HNSW_EF_SEARCH
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = Config.IVF_NPROBE
+
+
+def describe_index(index: faiss.Index) -> str:
+    """Returns a short name for the type of a (possibly ID-mapped) index."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return 'ivf_pq'
+    if isinstance(inner, faiss.IndexIVF):
+        return 'ivf_flat'
+    if isinstance(inner, faiss.IndexScalarQuantizer):
+        return 'sq8'
+    if isinstance(inner, faiss.IndexLSH):
+        return 'binary'
+    return 'flat'
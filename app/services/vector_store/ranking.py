@@ -0,0 +1,38 @@
+import numpy as np
+from typing import Dict, List, Sequence
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> Dict[int, float]:
+    """
+    Fuses several ranked id lists: each id scores sum(1 / (k + rank)) over the lists
+    it appears in. Returns {id: score}, insertion-ordered best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def maximal_marginal_relevance(relevance: np.ndarray, vectors: np.ndarray, k: int, diversity_lambda: float) -> List[int]:
+    """
+    Greedily picks k candidate positions, trading relevance against similarity to the
+    candidates already picked: lambda * relevance - (1 - lambda) * max similarity.
+    `relevance` is scaled to [0, 1] first so it is comparable with cosine similarity.
+    """
+    if len(relevance) == 0:
+        return []
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    remaining = set(range(len(relevance))) - set(selected)
+    while remaining and len(selected) < k:
+        candidates = np.array(sorted(remaining))
+        redundancy = similarity[np.ix_(candidates, selected)].max(axis=1)
+        scores = diversity_lambda * relevance[candidates] - (1 - diversity_lambda) * redundancy
+        best = int(candidates[np.argmax(scores)])
+        selected.append(best)
+        remaining.remove(best)
+    return selected
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import shutil
+import logging
+import faiss
+from typing import Mapping, NamedTuple, Optional
+import numpy as np
+from app.services.vector_store.bm25 import BM25Index
+from app.services.vector_store.chunk_store import ChunkStore, write_chunk_store, write_vectors
+
+logger = logging.getLogger(__name__)
+
+class IndexSnapshot(NamedTuple):
+    """
+    An immutable view of one index version. Searches grab a single reference to a
+    snapshot, so they never see an index paired with another version's texts.
+    """
+    version: int
+    index: Optional[faiss.Index]
+    # {chunk_id: text}; a memory-mapped ChunkStore once the snapshot has been persisted
+    text_store: Mapping[int, str]
+    # {'encoder': str, 'next_id': int, 'chunks': {chunk_id: {'source': ..., 'hash': ..., 'metadata': {...}}}}
+    manifest: dict
+    # Keyword index over the same chunks, for hybrid retrieval
+    lexical: Optional[BM25Index] = None
+
+
+EMPTY_SNAPSHOT = IndexSnapshot(0, None, {}, {"next_id": 0, "chunks": {}})
+
+
+def _fsync_file(path: str):
+    """Flushes a file that was written by another library to disk."""
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+class SnapshotStore:
+    """
+    Persists index snapshots as versioned directories under `<data>/index_snapshots`.
+    A snapshot is written to a temporary directory, renamed into place, and only
+    then published by atomically replacing the CURRENT pointer file, so readers
+    never pick up a half-written index.
+    """
+    INDEX_FILE = 'vector_index.bin'
+    CHUNKS_FILE = 'chunks.bin'
+    # Float embeddings row-aligned with CHUNKS_FILE, used to re-rank quantized indexes
+    VECTORS_FILE = 'vectors.npy'
+    BM25_FILE = 'bm25.json'
+    # Pre-chunk-store format, migrated to CHUNKS_FILE on first load
+    TEXT_FILE = 'text_store.json'
+    MANIFEST_FILE = 'index_manifest.json'
+
+    def __init__(self, data_path: str, keep: int = 2):
+        self.data_path = data_path
+        self.root = os.path.join(data_path, 'index_snapshots')
+        self.pointer_file = os.path.join(self.root, 'CURRENT')
+        self.keep = max(keep, 1)
+
+    def current_dir(self) -> Optional[str]:
+        """Returns the directory of the published snapshot, falling back to the pre-snapshot layout."""
+        if os.path.exists(self.pointer_file):
+            with open(self.pointer_file, 'r', encoding='utf-8') as f:
+                snapshot_dir = os.path.join(self.root, f.read().strip())
+            if os.path.exists(os.path.join(snapshot_dir, self.INDEX_FILE)):
+                return snapshot_dir
+        # Legacy layout: files written directly into the data directory
+        if os.path.exists(os.path.join(self.data_path, self.INDEX_FILE)) and (
+                os.path.exists(os.path.join(self.data_path, self.CHUNKS_FILE)) or
+                os.path.exists(os.path.join(self.data_path, self.TEXT_FILE))):
+            return self.data_path
+        return None
+
+    def exists(self) -> bool:
+        return self.current_dir() is not None
+
+    def write(self, snapshot: IndexSnapshot) -> str:
+        """Writes a snapshot into a new versioned directory, publishes it and returns the directory."""
+        os.makedirs(self.root, exist_ok=True)
+        snapshot_name = f"v{time.time_ns()}"
+        tmp_dir = os.path.join(self.root, f".{snapshot_name}.tmp")
+        os.makedirs(tmp_dir)
+
+        index_path = os.path.join(tmp_dir, self.INDEX_FILE)
+        logger.info(f"Saving FAISS index snapshot {snapshot_name}")
+        faiss.write_index(snapshot.index, index_path)
+        _fsync_file(index_path)
+        chunks = snapshot.manifest["chunks"]
+        write_chunk_store(os.path.join(tmp_dir, self.CHUNKS_FILE), snapshot.text_store,
+                          lambda chunk_id: chunks.get(chunk_id, {}).get("metadata"))
+        if hasattr(snapshot.text_store, 'vectors_for'):
+            write_vectors(os.path.join(tmp_dir, self.VECTORS_FILE),
+                          np.array(sorted(snapshot.text_store), dtype='int64'), snapshot.text_store.vectors_for)
+        if snapshot.lexical is not None:
+            self._write_json(os.path.join(tmp_dir, self.BM25_FILE), snapshot.lexical.to_dict())
+        self._write_json(os.path.join(tmp_dir, self.MANIFEST_FILE), {
+            "encoder": snapshot.manifest.get("encoder"),
+            "next_id": snapshot.manifest["next_id"],
+            "chunks": {str(i): meta for i, meta in snapshot.manifest["chunks"].items()},
+        })
+
+        snapshot_dir = os.path.join(self.root, snapshot_name)
+        os.rename(tmp_dir, snapshot_dir)
+        self._write_text_atomic(self.pointer_file, snapshot_name)
+        self._prune(snapshot_name)
+        return snapshot_dir
+
+    def open_chunks(self, snapshot_dir: str) -> ChunkStore:
+        """Memory-maps a snapshot's chunk store, migrating a legacy text_store.json first."""
+        chunks_path = os.path.join(snapshot_dir, self.CHUNKS_FILE)
+        if not os.path.exists(chunks_path):
+            self._migrate_text_store(snapshot_dir)
+        return ChunkStore(chunks_path, os.path.join(snapshot_dir, self.VECTORS_FILE))
+
+    def _migrate_text_store(self, snapshot_dir: str):
+        """Converts a JSON text store (list or {id: text}) into the binary chunk store, once."""
+        json_path = os.path.join(snapshot_dir, self.TEXT_FILE)
+        logger.info(f"Migrating {json_path} to the binary chunk store.")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            text_store = json.load(f)
+        if isinstance(text_store, list):
+            # Legacy format: a plain list where FAISS positions are the ids
+            text_store = dict(enumerate(text_store))
+        else:
+            text_store = {int(i): text for i, text in text_store.items()}
+
+        metadata = {}
+        manifest_path = os.path.join(snapshot_dir, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                metadata = {int(i): meta.get("metadata") for i, meta in json.load(f)["chunks"].items()}
+        write_chunk_store(os.path.join(snapshot_dir, self.CHUNKS_FILE), text_store, metadata.get)
+
+    def read(self, version: int) -> Optional[IndexSnapshot]:
+        """Loads the published snapshot, or returns None if there is none."""
+        snapshot_dir = self.current_dir()
+        if snapshot_dir is None:
+            return None
+        logger.info(f"Loading vector index snapshot from: {snapshot_dir}")
+        index = faiss.read_index(os.path.join(snapshot_dir, self.INDEX_FILE))
+        text_store = self.open_chunks(snapshot_dir)
+
+        manifest = {"next_id": 0, "chunks": {}}
+        manifest_path = os.path.join(snapshot_dir, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            manifest = {
+                "encoder": stored.get("encoder"),
+                "next_id": stored["next_id"],
+                "chunks": {int(i): meta for i, meta in stored["chunks"].items()},
+            }
+
+        bm25_path = os.path.join(snapshot_dir, self.BM25_FILE)
+        if os.path.exists(bm25_path):
+            with open(bm25_path, 'r', encoding='utf-8') as f:
+                lexical = BM25Index.from_dict(json.load(f))
+        else:
+            # Snapshots from before hybrid retrieval: index the stored chunks now
+            logger.info("No keyword index in this snapshot. Building it from the chunk store.")
+            lexical = BM25Index.build(text_store.items())
+        return IndexSnapshot(version, index, text_store, manifest, lexical)
+
+    @staticmethod
+    def _write_json(path: str, data):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _write_text_atomic(path: str, text: str):
+        """Replaces a small file in one step (write to a temp file, then rename over)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _prune(self, current: str):
+        """Deletes all but the newest `keep` snapshots and temp directories abandoned by a crash."""
+        names = sorted(n for n in os.listdir(self.root) if n.startswith('v'))
+        stale = [n for n in names[:-self.keep] if n != current]
+        cutoff = time.time() - 3600
+        stale += [
+            n for n in os.listdir(self.root)
+            if n.startswith('.') and n.endswith('.tmp') and os.path.getmtime(os.path.join(self.root, n)) < cutoff
+        ]
+        for name in stale:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
@@ -1,88 +1,526 @@
 import os
+import time
+import asyncio
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import json
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.config import Config
-from typing import List
+from app.services.log_setup import timed_stage
+from app.services.metrics import SEARCH_BATCH_SIZE
+from app.services.vector_store.cache import LRUCache
+from app.services.vector_store.embeddings import DEFAULT_MODEL_NAME, encoder_id, get_embedding_model
+from app.services.vector_store.batcher import QueryBatcher
+from app.services.vector_store.bm25 import BM25Index
+from app.services.vector_store.chunk_store import ChunkOverlay
+from app.services.vector_store.ranking import maximal_marginal_relevance, reciprocal_rank_fusion
+from app.services.vector_store.snapshot import EMPTY_SNAPSHOT, IndexSnapshot, SnapshotStore
+from app.services.vector_store.index_factory import (
+    QUANTIZED_INDEX_TYPES, apply_search_params, build_index, describe_index, resolve_index_type,
+)
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# (source, content hash): identifies a chunk across index versions
+ChunkKey = Tuple[str, str]
+
 class VectorStoreService:
     """
     Manages vector indexing and similarity search for text data.
     """
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        logger.info(f"Initializing SentenceTransformer with model: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        self.index = None
-        self.text_store = []
-        
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, model=None):
+        # Reuse the process-wide encoder unless one is injected explicitly
+        if model is None:
+            model = get_embedding_model(model_name, Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL_FILE)
+            self.encoder_id = encoder_id(model_name, Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL_FILE)
+        else:
+            # An injected model is trusted to match the stored vectors
+            self.encoder_id = None
+        self.model = model
+        # The live (index, texts, manifest) version. Replaced as a whole, never mutated.
+        self.snapshot: IndexSnapshot = EMPTY_SNAPSHOT
+        # Serialises index rebuilds; searches never take this lock
+        self._update_lock = threading.Lock()
+        # Monotonic time of the last snapshot written to disk, and whether the live one is newer
+        self._last_write: Optional[float] = None
+        self._unsaved = False
+        self.embedding_cache = LRUCache(Config.QUERY_EMBEDDING_CACHE_SIZE)
+        self.result_cache = LRUCache(Config.SEARCH_RESULT_CACHE_SIZE)
+        # Bounded pool for CPU-bound encode/search so callers on the event loop never block
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.EMBEDDING_WORKERS, thread_name_prefix="vector-search"
+        )
+        self.batcher = None
+        if Config.QUERY_BATCH_WINDOW_MS > 0:
+            self.batcher = QueryBatcher(
+                self.search_batch,
+                self.executor,
+                window_ms=Config.QUERY_BATCH_WINDOW_MS,
+                max_batch_size=Config.QUERY_BATCH_MAX_SIZE,
+            )
+
         # Use the configured data path
         self.data_path = Config.DATA_PATH
-        self.index_file = os.path.join(self.data_path, 'vector_index.bin')
-        self.text_file = os.path.join(self.data_path, 'text_store.json')
+        self.snapshots = SnapshotStore(self.data_path, keep=Config.INDEX_SNAPSHOTS_TO_KEEP)
 
-    def create_and_save_index(self, data: List[str]):
-        """
-        Creates a new FAISS index from a list of text data and saves it.
-        """
-        if not data:
-            logger.warning("No data provided to create vector index.")
-            return
+    # Read-only views of the live snapshot
+    @property
+    def index(self) -> Optional[faiss.Index]:
+        return self.snapshot.index
+
+    @property
+    def text_store(self) -> Mapping[int, str]:
+        return self.snapshot.text_store
+
+    @property
+    def manifest(self) -> dict:
+        return self.snapshot.manifest
+
+    @property
+    def index_version(self) -> int:
+        return self.snapshot.version
 
-        logger.info("Creating new vector index...")
-        self.text_store = data
-        embeddings = self.model.encode(data, show_progress_bar=True)
+    def has_index(self) -> bool:
+        """Returns True if a persisted index exists on disk."""
+        return self.snapshots.exists()
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Returns the content hash used to detect changed chunks."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _encode_corpus(self, texts: List[str]) -> np.ndarray:
+        """Encodes and L2-normalises a list of chunk texts."""
+        with timed_stage("corpus_encode"):
+            embeddings = self.model.encode(texts, batch_size=Config.EMBEDDING_BATCH_SIZE, show_progress_bar=False)
         embeddings = np.array(embeddings).astype('float32')
         faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def _embed_new_chunks(self, chunks: Iterable[dict], known: Set[ChunkKey]) -> Tuple[Set[ChunkKey], List[Tuple[ChunkKey, dict]], np.ndarray]:
+        """
+        Consumes a stream of chunks and embeds those whose (source, content hash) key
+        is not in `known`, in batches of EMBEDDING_BATCH_SIZE as they arrive, so
+        encoding overlaps with whatever is still producing chunks.
+        Returns (every key seen, new (key, chunk) pairs, their embeddings).
+        Exact duplicates within a source are dropped, and a chunk marked 'retract'
+        withdraws an earlier chunk with the same source and text.
+        """
+        seen: Set[ChunkKey] = set()
+        retracted: Set[ChunkKey] = set()
+        fresh: List[Tuple[ChunkKey, dict]] = []
+        batches: List[np.ndarray] = []
+        pending: List[str] = []
+        for chunk in chunks:
+            key = (chunk['source'], self.content_hash(chunk['text']))
+            if chunk.get('retract'):
+                retracted.add(key)
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in known:
+                continue
+            fresh.append((key, chunk))
+            pending.append(chunk['text'])
+            if len(pending) >= Config.EMBEDDING_BATCH_SIZE:
+                batches.append(self._encode_corpus(pending))
+                pending = []
+        if pending:
+            batches.append(self._encode_corpus(pending))
+        embeddings = np.vstack(batches) if batches else np.empty((0, self.model.get_sentence_embedding_dimension()), dtype='float32')
+        if retracted:
+            keep = np.array([key not in retracted for key, _ in fresh], dtype=bool)
+            fresh = [entry for entry, kept in zip(fresh, keep) if kept]
+            embeddings = embeddings[keep]
+            seen -= retracted
+        return seen, fresh, embeddings
 
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
-        self.index.add(embeddings)
+    def create_and_save_index(self, chunks: Iterable[dict]):
+        """
+        Creates a new FAISS index from chunks ({'source': ..., 'text': ..., 'metadata': {...}}) and saves it.
+        `chunks` may be any iterable, including a generator fed by the data pipeline.
+        """
+        with self._update_lock:
+            _, fresh, embeddings = self._embed_new_chunks(chunks, set())
+            if not fresh:
+                logger.warning("No data provided to create vector index.")
+                return
+            self._create_index(fresh, embeddings)
 
-        logger.info(f"Saving FAISS index to {self.index_file}")
-        faiss.write_index(self.index, self.index_file)
+    def _create_index(self, entries: List[Tuple[ChunkKey, dict]], embeddings: np.ndarray):
+        logger.info("Creating new vector and keyword indexes...")
+        ids = np.arange(len(entries), dtype='int64')
 
-        logger.info(f"Saving text store to {self.text_file}")
-        with open(self.text_file, 'w', encoding='utf-8') as f:
-            json.dump(self.text_store, f)
+        self._publish(
+            build_index(embeddings, ids=ids),
+            ChunkOverlay(
+                {},
+                added={int(i): chunk['text'] for i, (_, chunk) in zip(ids, entries)},
+                added_vectors={int(i): row for i, row in zip(ids, embeddings)},
+            ),
+            {
+                "encoder": self.encoder_id,
+                "next_id": len(entries),
+                "chunks": {
+                    int(i): {"source": source, "hash": digest, "metadata": chunk.get("metadata") or {}}
+                    for i, ((source, digest), chunk) in zip(ids, entries)
+                },
+            },
+            BM25Index.build((int(i), chunk['text']) for i, (_, chunk) in zip(ids, entries)),
+        )
         logger.info("Vector index created and saved successfully.")
 
+    def update_index(self, chunks: Iterable[dict], prune: Optional[Callable[[str], bool]] = None):
+        """
+        Incrementally syncs the index with `chunks`: only new or changed chunks are
+        embedded and chunks that disappeared are removed. Stale chunks are only
+        removed from sources for which `prune(source)` is true (all sources by default),
+        so a source that failed to fetch keeps its previous chunks.
+        `chunks` may be a generator; `prune` is only consulted once it is exhausted.
+        """
+        with self._update_lock:
+            self._update_index(chunks, prune)
+            if self._unsaved and self._write_due():
+                self._write_snapshot(self.snapshot)
+
+    def _update_index(self, chunks: Iterable[dict], prune: Optional[Callable[[str], bool]]):
+        current = self.snapshot
+        incremental = (
+            current.index is not None and isinstance(current.index, faiss.IndexIDMap) and current.manifest["chunks"]
+        )
+        if incremental and self.encoder_id and current.manifest.get("encoder") not in (None, self.encoder_id):
+            logger.info(f"Encoder changed ({current.manifest.get('encoder')} -> {self.encoder_id}). Re-embedding everything.")
+            incremental = False
+        existing = {
+            (meta["source"], meta["hash"]): chunk_id for chunk_id, meta in current.manifest["chunks"].items()
+        } if incremental else {}
+
+        wanted, fresh, fresh_embeddings = self._embed_new_chunks(chunks, set(existing))
+        if not incremental:
+            if not fresh:
+                logger.warning("No data provided to create vector index.")
+                return
+            logger.info("No incremental index state found. Building the index from scratch.")
+            return self._create_index(fresh, fresh_embeddings)
+
+        stale = [
+            chunk_id for key, chunk_id in existing.items()
+            if key not in wanted and (prune is None or prune(key[0]))
+        ]
+        if not stale and not fresh:
+            logger.info("Vector index is already up to date. Nothing to re-embed.")
+            return
+
+        remaining = len(existing) - len(stale) + len(fresh)
+        if resolve_index_type(remaining, dimension=current.index.d) != describe_index(current.index):
+            logger.info("Corpus size crossed the index type threshold. Rebuilding the index.")
+            stale_ids = set(stale)
+            kept = [
+                ((meta["source"], meta["hash"]),
+                 {"source": meta["source"], "text": current.text_store[chunk_id], "metadata": meta.get("metadata") or {}})
+                for chunk_id, meta in current.manifest["chunks"].items() if chunk_id not in stale_ids
+            ]
+            kept_embeddings = fresh_embeddings[:0]
+            if kept:
+                # Reuse the stored float vectors when the snapshot has them
+                vectors_for = getattr(current.text_store, 'vectors_for', None)
+                kept_ids = [chunk_id for chunk_id in current.manifest["chunks"] if chunk_id not in stale_ids]
+                kept_embeddings = vectors_for(kept_ids) if vectors_for else None
+                if kept_embeddings is None:
+                    kept_embeddings = self._encode_corpus([chunk['text'] for _, chunk in kept])
+            return self._create_index(kept + fresh, np.vstack([kept_embeddings, fresh_embeddings]))
+
+        logger.info(f"Incremental re-index: {len(fresh)} new/changed chunks, {len(stale)} stale chunks.")
+        # Work on copies so in-flight searches keep using the current snapshot. Texts
+        # go into an overlay and BM25 postings are copied on write, so only the FAISS
+        # clone (a copy of every stored code) and the shallow manifest copy grow with
+        # the corpus; "index_copy" in the stage metrics shows what they cost.
+        with timed_stage("index_copy"):
+            index = faiss.clone_index(current.index)
+            text_store = ChunkOverlay(current.text_store)
+            # Every snapshot with an index also has its keyword index (load() builds a missing one)
+            lexical = current.lexical.copy()
+            manifest = {
+                "encoder": current.manifest.get("encoder") or self.encoder_id,
+                "next_id": current.manifest["next_id"],
+                "chunks": dict(current.manifest["chunks"]),
+            }
+
+        if stale:
+            index = self._remove_ids(index, stale, manifest)
+            for chunk_id in stale:
+                lexical.remove(chunk_id, current.text_store[chunk_id])
+                text_store.removed.add(chunk_id)
+                manifest["chunks"].pop(chunk_id, None)
+
+        if fresh:
+            first_id = manifest["next_id"]
+            ids = np.arange(first_id, first_id + len(fresh), dtype='int64')
+            index.add_with_ids(fresh_embeddings, ids)
+            for chunk_id, ((source, digest), chunk), vector in zip(ids, fresh, fresh_embeddings):
+                text_store.added[int(chunk_id)] = chunk['text']
+                text_store.added_vectors[int(chunk_id)] = vector
+                lexical.add(int(chunk_id), chunk['text'])
+                manifest["chunks"][int(chunk_id)] = {
+                    "source": source, "hash": digest, "metadata": chunk.get("metadata") or {}
+                }
+            manifest["next_id"] = first_id + len(fresh)
+
+        self._publish(index, text_store, manifest, lexical, defer_write=True)
+        logger.info("Vector index updated successfully.")
+
+    @staticmethod
+    def _remove_ids(index: faiss.Index, stale: List[int], manifest: dict) -> faiss.Index:
+        """Removes chunk ids from an ID-mapped index, rebuilding it if the index type can't delete."""
+        try:
+            index.remove_ids(np.array(stale, dtype='int64'))
+            return index
+        except RuntimeError:
+            # HNSW graphs don't support deletion; rebuild from the stored vectors we keep
+            stale_ids = set(stale)
+            kept = np.array([i for i in manifest["chunks"] if i not in stale_ids], dtype='int64')
+            if not len(kept):
+                return build_index(np.empty((0, index.d), dtype='float32'), describe_index(index), ids=kept)
+            vectors = np.vstack([index.reconstruct(int(i)) for i in kept])
+            return build_index(vectors, describe_index(index), ids=kept)
+
+    def _publish(self, index: faiss.Index, text_store: Mapping[int, str], manifest: dict, lexical: BM25Index,
+                 defer_write: bool = False):
+        """
+        Persists a new snapshot atomically, then swaps it in with a single reference
+        assignment. In-flight searches finish on the snapshot they started with.
+        Writing a snapshot rewrites every file, so with `defer_write` (incremental
+        updates) it is skipped within INDEX_WRITE_MIN_INTERVAL_SECONDS of the last
+        write: the snapshot goes live from memory and a later write or flush() saves it.
+        """
+        snapshot = IndexSnapshot(self.snapshot.version + 1, index, text_store, manifest, lexical)
+        if defer_write and not self._write_due():
+            logger.info("Index snapshot written recently. Serving the update from memory until the next write.")
+            self._unsaved = True
+            self._swap(snapshot)
+            return
+        self._write_snapshot(snapshot)
+
+    def _write_due(self) -> bool:
+        return self._last_write is None or time.monotonic() - self._last_write >= Config.INDEX_WRITE_MIN_INTERVAL_SECONDS
+
+    def _write_snapshot(self, snapshot: IndexSnapshot):
+        """Writes `snapshot` to disk and makes it live, reading its texts from the memory-mapped chunk store just written."""
+        with timed_stage("index_write"):
+            snapshot_dir = self.snapshots.write(snapshot)
+        self._last_write = time.monotonic()
+        self._unsaved = False
+        self._swap(snapshot._replace(text_store=self.snapshots.open_chunks(snapshot_dir)))
+        logger.info(f"Index snapshot {snapshot.version} saved.")
+
+    def flush(self):
+        """Writes the live snapshot to disk if an update was only applied in memory."""
+        with self._update_lock:
+            if self._unsaved:
+                self._write_snapshot(self.snapshot)
+
+    def _swap(self, snapshot: IndexSnapshot):
+        """Makes `snapshot` live and drops everything cached for the previous one."""
+        self.snapshot = snapshot
+        self.embedding_cache.clear()
+        self.result_cache.clear()
+
     def load_index(self) -> bool:
         """
-        Loads an existing FAISS index and text store from files.
+        Loads the published index snapshot (index, text store and manifest) from disk.
         """
-        if os.path.exists(self.index_file) and os.path.exists(self.text_file):
-            logger.info(f"Loading existing vector index from: {self.index_file}")
+        with self._update_lock:
             try:
-                self.index = faiss.read_index(self.index_file)
-                with open(self.text_file, 'r', encoding='utf-8') as f:
-                    self.text_store = json.load(f)
-                logger.info("Vector index and text store loaded successfully into memory.")
+                snapshot = self.snapshots.read(self.snapshot.version + 1)
+                if snapshot is None:
+                    logger.warning("Index files not found. A new index needs to be created.")
+                    return False
+                apply_search_params(snapshot.index)
+                self._swap(snapshot)
+                logger.info(f"Vector index ({describe_index(snapshot.index)}) and text store loaded successfully into memory.")
                 return True
             except Exception as e:
                 logger.error(f"Error loading index or text store: {e}", exc_info=True)
                 return False
-        logger.warning("Index files not found. A new index needs to be created.")
-        return False
 
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Collapses case and whitespace so trivially different queries share a cache entry."""
+        return " ".join(query.lower().split())
 
-    def search(self, query: str, k: int = 5) -> List[str]:
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
         """
-        Performs a similarity search on the index for a given query.
+        Returns one L2-normalised embedding row per query. Cache misses are encoded
+        together in a single model call.
+        """
+        keys = [self._normalize_query(q) for q in queries]
+        rows = [self.embedding_cache.get(key) for key in keys]
+        missing = sorted({key for key, row in zip(keys, rows) if row is None})
+        if missing:
+            with timed_stage("query_encode"):
+                encoded = np.array(self.model.encode(missing)).astype('float32')
+            faiss.normalize_L2(encoded)
+            fresh = dict(zip(missing, encoded))
+            for key, row in fresh.items():
+                self.embedding_cache.put(key, row)
+            rows = [row if row is not None else fresh[key] for key, row in zip(keys, rows)]
+        return np.vstack(rows)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Returns the L2-normalised embedding of one query, sharing the query embedding cache with search."""
+        return self._embed_queries([query])[0]
+
+    async def embed_query_async(self, query: str) -> np.ndarray:
+        """embed_query() in the bounded executor, so the event loop never blocks on the encoder."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.embed_query, query)
+
+    def cache_stats(self) -> Dict[str, dict]:
+        """Returns hit/miss counters for the query embedding and search result caches."""
+        return {
+            "query_embedding": self.embedding_cache.stats(),
+            "search_result": self.result_cache.stats(),
+        }
+
+    def index_stats(self) -> Dict[str, float]:
+        """Returns the size of the live index: chunk count, snapshot version and bytes on disk."""
+        snapshot = self.snapshot
+        snapshot_dir = self.snapshots.current_dir()
+        disk_bytes = 0
+        if snapshot_dir is not None:
+            store = self.snapshots
+            for name in (store.INDEX_FILE, store.CHUNKS_FILE, store.VECTORS_FILE, store.BM25_FILE,
+                         store.TEXT_FILE, store.MANIFEST_FILE):
+                try:
+                    disk_bytes += os.path.getsize(os.path.join(snapshot_dir, name))
+                except OSError:
+                    pass
+        return {
+            "chunks": snapshot.index.ntotal if snapshot.index is not None else 0,
+            "version": snapshot.version,
+            "disk_bytes": disk_bytes,
+        }
+
+    def search_batch(self, requests: List[Tuple[str, int]]) -> List[List[str]]:
+        """
+        Performs hybrid searches for several (query, k) requests with one encode call
+        and one dense index search over the stacked query matrix. Each query's dense
+        and BM25 rankings are then fused, filtered and diversified (see _retrieve).
         """
-        if self.index is None:
+        # One read of the live snapshot: index and texts always belong together
+        snapshot = self.snapshot
+        if snapshot.index is None:
             logger.error("Index is not loaded in memory. Cannot perform search.")
             raise RuntimeError("Index is not loaded. Call create_and_save_index() or load_index() first.")
 
-        logger.info(f"Performing similarity search for query: '{query}'")
-        query_embedding = self.model.encode([query])
-        query_embedding = np.array(query_embedding).astype('float32')
-        faiss.normalize_L2(query_embedding)
+        version, text_store = snapshot.version, snapshot.text_store
+        SEARCH_BATCH_SIZE.observe(len(requests))
+        keys = [self._normalize_query(query) for query, _ in requests]
+
+        results: List[Optional[List[str]]] = [None] * len(requests)
+        pending = []
+        for row, (key, (_, k)) in enumerate(zip(keys, requests)):
+            cached = self.result_cache.get((key, k, version))
+            if cached is not None:
+                results[row] = list(cached)
+            else:
+                pending.append(row)
+
+        if pending:
+            embeddings = self._embed_queries([requests[row][0] for row in pending])
+            candidates = max(Config.RETRIEVAL_CANDIDATES, max(requests[row][1] for row in pending))
+            # Quantized codes only approximate the scores: over-fetch, then re-rank with float vectors
+            rerank = Config.VECTOR_RERANK_FACTOR > 1 and describe_index(snapshot.index) in QUANTIZED_INDEX_TYPES
+            fetch_k = candidates * Config.VECTOR_RERANK_FACTOR if rerank else candidates
+            with timed_stage("dense_search"):
+                _, indices = snapshot.index.search(embeddings, fetch_k)
+            for row, embedding, row_indices in zip(pending, embeddings, indices):
+                k = requests[row][1]
+                dense_ids = [int(i) for i in row_indices if i >= 0]
+                with timed_stage("hybrid_rerank"):
+                    hit_ids = self._retrieve(snapshot, keys[row], embedding, dense_ids, candidates, k)
+                # Only the k hits are decoded from the chunk store
+                chunks = [text for text in (text_store.get(i) for i in hit_ids) if text is not None]
+                self.result_cache.put((keys[row], k, version), tuple(chunks))
+                results[row] = chunks
+        return results
+
+    def _retrieve(self, snapshot: IndexSnapshot, query: str, embedding: np.ndarray,
+                  dense_ids: List[int], candidates: int, k: int) -> List[int]:
+        """
+        Picks the final k chunk ids for one query:
+        1. dense candidates are ordered by exact cosine similarity (from the stored vectors),
+        2. fused with the BM25 ranking by reciprocal rank fusion,
+        3. dense-only candidates below RETRIEVAL_MIN_SIMILARITY are dropped (keyword hits are kept),
+        4. MMR trades relevance against redundancy among what's left.
+        Steps needing the float vectors are skipped for snapshots that don't store them.
+        """
+        text_store = snapshot.text_store
+        vectors_for = getattr(text_store, 'vectors_for', None)
+        dense_ids = self._rerank(text_store, embedding, dense_ids)[:candidates]
+        lexical_ids = []
+        if Config.HYBRID_SEARCH and snapshot.lexical is not None:
+            lexical_ids = [chunk_id for chunk_id, _ in snapshot.lexical.search(query, candidates)]
+
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], Config.RRF_K)
+        ids = list(fused)
+        vectors = vectors_for(ids) if vectors_for is not None and ids else None
+        if vectors is None:
+            return ids[:k]
+
+        if Config.RETRIEVAL_MIN_SIMILARITY > 0:
+            lexical_hits = set(lexical_ids)
+            keep = [
+                i for i, similarity in enumerate(vectors @ embedding)
+                if similarity >= Config.RETRIEVAL_MIN_SIMILARITY or ids[i] in lexical_hits
+            ]
+            ids, vectors = [ids[i] for i in keep], vectors[keep]
+
+        if Config.MMR_LAMBDA < 1 and len(ids) > k:
+            relevance = np.array([fused[chunk_id] for chunk_id in ids])
+            picked = maximal_marginal_relevance(relevance, vectors, k, Config.MMR_LAMBDA)
+            return [ids[i] for i in picked]
+        return ids[:k]
+
+    @staticmethod
+    def _rerank(text_store: Mapping[int, str], query: np.ndarray, hit_ids: List[int]) -> List[int]:
+        """Orders candidate ids by exact inner product with the query, using the stored float vectors."""
+        vectors_for = getattr(text_store, 'vectors_for', None)
+        if not hit_ids or vectors_for is None:
+            return hit_ids
+        vectors = vectors_for(hit_ids)
+        if vectors is None:
+            return hit_ids
+        order = np.argsort(-(vectors @ query), kind='stable')
+        return [hit_ids[i] for i in order]
+
+    def search(self, query: str, k: int = 5) -> List[str]:
+        """
+        Performs a similarity search on the index for a given query.
+        """
+        logger.debug(f"Performing similarity search for query: '{query}'")
+        results = self.search_batch([(query, k)])[0]
+        logger.debug(f"Found {len(results)} relevant text chunks.")
+        return results
+
+    async def search_async(self, query: str, k: int = 5) -> List[str]:
+        """
+        Searches without blocking the event loop. Queries arriving together are
+        micro-batched into one encode/search call in the bounded executor.
+        """
+        if self.batcher is not None:
+            logger.debug(f"Queueing similarity search for query: '{query}'")
+            return await self.batcher.submit(query, k)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.search, query, k)
 
-        distances, indices = self.index.search(query_embedding, k)
-        results = [self.text_store[i] for i in indices[0] if i < len(self.text_store)]
-        logger.info(f"Found {len(results)} relevant text chunks.")
-        return results
\ No newline at end of file
+    async def shutdown(self):
+        """Lets in-flight batched searches finish, saves any unsaved update, then stops the search executor."""
+        if self.batcher is not None:
+            await self.batcher.shutdown()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.flush)
+        self.executor.shutdown(wait=False)
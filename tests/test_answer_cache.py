@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.services.answer_cache import SemanticAnswerCache
+
+QUESTION = "What did he build with Rust?"
+EMBEDDING = np.array([1.0, 0.0], dtype='float32')
+
+
+def test_lookup_on_an_older_index_version_keeps_the_cache():
+    cache = SemanticAnswerCache(max_entries=4, threshold=0.9)
+    cache.put(QUESTION, EMBEDDING, 2, "A compiler.")
+
+    assert cache.get(QUESTION, EMBEDDING, 1) is None
+    assert len(cache) == 1
+    assert cache.get(QUESTION, EMBEDDING, 2) == "A compiler."
+
+
+def test_newer_index_version_drops_cached_answers():
+    cache = SemanticAnswerCache(max_entries=4, threshold=0.9)
+    cache.put(QUESTION, EMBEDDING, 2, "A compiler.")
+
+    assert cache.get(QUESTION, EMBEDDING, 3) is None
+    assert len(cache) == 0
@@ -0,0 +1,57 @@
+import itertools
+
+from app.pipelines.chunking import Chunker, ChunkDeduplicator, split_shared_lines
+
+NAVBAR = "Home About Projects Blog Contact me for freelance web development work"
+
+
+def _kept_owners(arrivals, threshold=0.9):
+    dedup = ChunkDeduplicator(threshold)
+    kept = set()
+    for owner, text in arrivals:
+        keep, displaced = dedup.add(text, owner)
+        kept.discard(displaced)
+        if keep:
+            kept.add(owner)
+    return kept
+
+
+def test_duplicate_survivor_does_not_depend_on_arrival_order():
+    arrivals = [
+        (("website:https://example.com/b", 0), NAVBAR),
+        (("github:site", 3), NAVBAR.upper()),
+        (("website:https://example.com/a", 0), NAVBAR + " today"),
+        (("pdf:resume.pdf#page=1", 0), "Unrelated text about compilers and type systems in general"),
+    ]
+    results = {frozenset(_kept_owners(order)) for order in itertools.permutations(arrivals)}
+    assert results == {frozenset({("github:site", 3), ("pdf:resume.pdf#page=1", 0)})}
+
+
+def test_is_duplicate_keeps_the_first_copy():
+    dedup = ChunkDeduplicator()
+    assert not dedup.is_duplicate(NAVBAR)
+    assert dedup.is_duplicate(NAVBAR.lower())
+    assert dedup.exact_duplicates == 1
+
+
+def test_shared_navigation_is_split_from_page_content():
+    nav = "Home\nAbout\nProjects\nContact"
+    pages = [
+        ("https://example.com/a", f"{nav}\nI build compilers in Rust.\nThey are fast."),
+        ("https://example.com/b", f"{nav}\nMy blog covers databases.\n© 2024 Example"),
+        ("https://example.com/c", f"{nav}\nA page about hiking.\n© 2024 Example"),
+    ]
+    stripped, shared = split_shared_lines(pages)
+    assert shared == ["Home", "About", "Projects", "Contact", "© 2024 Example"]
+    assert stripped[0] == ("https://example.com/a", "I build compilers in Rust.\nThey are fast.")
+    assert stripped[1][1] == "My blog covers databases."
+
+    chunker = Chunker(max_tokens=16, overlap_tokens=0)
+    chunks = [chunk for _, text in stripped for chunk in chunker.split(text.replace("\n", "\n\n"))]
+    assert not any("Home" in chunk for chunk in chunks)
+    assert "I build compilers in Rust." in chunks[0] and "They are fast." in chunks[0]
+
+
+def test_single_page_keeps_its_lines():
+    pages = [("https://example.com/", "Home\nHello")]
+    assert split_shared_lines(pages) == (pages, [])
@@ -0,0 +1,84 @@
+import pytest
+import requests
+
+from app.benchmarks.fixtures import FixtureServer
+from app.services import github_service
+from app.services.github_service import GitHubService, RateLimitTracker
+
+
+@pytest.fixture
+def github():
+    with FixtureServer(repos=3, site_pages=1, pdf_pages=1) as server:
+        yield server
+
+
+def _service(server, **kwargs):
+    return GitHubService("test-token", base_url=f"{server.url}/github", **kwargs)
+
+
+def test_graphql_falls_back_to_rest_for_unaliased_readmes(github):
+    github.fixtures.unaliased_readmes.add("project-001")
+    service = _service(github, use_graphql=True)
+
+    repos = {repo["name"]: repo for repo in service.iter_detailed_repos()}
+
+    assert service.complete
+    assert repos["project-001"]["readme_content"] == github.fixtures.readmes["project-001"]
+    assert repos["project-000"]["readme_content"] == github.fixtures.readmes["project-000"]
+    assert github.hits.get("/github/repos/bench/project-001/readme") == 1
+    assert "/github/repos/bench/project-000/readme" not in github.hits
+
+
+def test_unchanged_responses_are_reused_from_the_cache(github, tmp_path):
+    cache_file = str(tmp_path / "github_cache.json")
+    first = _service(github, cache_file=cache_file).fetch_all_detailed_repos()
+
+    service = _service(github, cache_file=cache_file)
+    second = service.fetch_all_detailed_repos()
+
+    assert second == first
+    # The repository list plus one README per repository
+    assert service.not_modified_count == 4
+
+
+def test_cached_next_page_link_is_followed_on_304(github, tmp_path):
+    github.fixtures.page_size = 2
+    cache_file = str(tmp_path / "github_cache.json")
+    _service(github, cache_file=cache_file).fetch_all_detailed_repos()
+    assert github.hits["/github/user/repos"] == 2
+
+    service = _service(github, cache_file=cache_file)
+    repos = service.fetch_all_detailed_repos()
+
+    # The 304 for page one has no Link header, so page two is only reachable through the cache
+    assert [repo["name"] for repo in repos] == list(github.fixtures.readmes)
+    assert github.hits["/github/user/repos"] == 4
+    assert service.not_modified_count == 5
+
+
+def test_retry_after_is_honoured(github, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(github_service.time, "sleep", sleeps.append)
+    github.throttled = 1
+    service = _service(github)
+
+    repos = service.fetch_all_detailed_repos()
+
+    assert sleeps == [2.0]
+    assert service.complete
+    assert len(repos) == 3
+
+
+def test_rate_limit_tracker_spreads_the_remaining_quota(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(github_service.time, "sleep", sleeps.append)
+    monkeypatch.setattr(github_service.time, "time", lambda: 1000.0)
+    tracker = RateLimitTracker(reserve=100, max_wait=60.0)
+    response = requests.Response()
+    response.headers.update({'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': '1020'})
+    tracker.update(response)
+
+    tracker.wait()
+
+    assert sleeps == [pytest.approx(2.0)]
+    assert tracker.remaining == 9
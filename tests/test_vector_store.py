@@ -0,0 +1,85 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+from app.config import Config
+from app.services.vector_store.index_factory import describe_index, resolve_index_type
+from app.services.vector_store.vector_store_service import VectorStoreService
+
+DIMENSION = 16
+
+
+class HashEncoder:
+    """Deterministic stand-in for a SentenceTransformer: one pseudo-random vector per text."""
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        seeds = [int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], 'little') for text in texts]
+        return np.array([np.random.default_rng(seed).standard_normal(DIMENSION) for seed in seeds], dtype='float32')
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+
+def _chunks(count):
+    return [{"source": f"doc-{i % 5}", "text": f"chunk number {i}", "metadata": {}} for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(Config, "QUERY_BATCH_WINDOW_MS", 0)
+    service = VectorStoreService(model=HashEncoder())
+    yield service
+    service.executor.shutdown(wait=False)
+
+
+def test_ivf_pq_falls_back_to_ivf_flat_below_training_size():
+    assert resolve_index_type(100, 'ivf_pq', DIMENSION) == 'ivf_flat'
+    assert resolve_index_type(1000, 'ivf_pq', DIMENSION + 1) == 'ivf_flat'
+    assert resolve_index_type(1000, 'ivf_pq', DIMENSION) == 'ivf_pq'
+
+
+def test_small_ivf_pq_corpus_updates_incrementally(store, monkeypatch):
+    monkeypatch.setattr(Config, "VECTOR_INDEX_TYPE", "ivf_pq")
+    store.update_index(_chunks(50))
+    assert describe_index(store.index) == 'ivf_flat'
+
+    def full_rebuild(*args, **kwargs):
+        raise AssertionError("a one-chunk change must not rebuild the index")
+    monkeypatch.setattr(store, "_create_index", full_rebuild)
+    store.model.encoded = 0
+    store.update_index(_chunks(51))
+
+    assert store.model.encoded == 1
+    assert store.index.ntotal == 51
+    assert describe_index(store.index) == 'ivf_flat'
+
+
+def test_hnsw_update_replacing_every_chunk(store, monkeypatch):
+    monkeypatch.setattr(Config, "VECTOR_INDEX_TYPE", "hnsw")
+    store.update_index(_chunks(10))
+    assert describe_index(store.index) == 'hnsw'
+
+    replacement = [{"source": "doc-0", "text": "an entirely new chunk", "metadata": {}}]
+    store.update_index(replacement)
+
+    assert store.index.ntotal == 1
+    assert list(store.text_store.values()) == ["an entirely new chunk"]
+
+
+def test_keyword_index_of_the_previous_snapshot_is_untouched(store):
+    store.update_index(_chunks(10))
+    previous = store.snapshot.lexical
+    before = previous.search("chunk number 3", 10)
+
+    store.update_index(_chunks(9) + [{"source": "doc-9", "text": "chunk number 3 again", "metadata": {}}])
+
+    assert previous.search("chunk number 3", 10) == before
+    assert store.snapshot.lexical.search("again", 1)[0][0] not in previous.doc_lengths